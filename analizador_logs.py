@@ -7,81 +7,1543 @@ Debe identificar los mensajes de error más frecuentes
 Debe generar un informe resumido
 """
 
+import os
 import re
-from collections import Counter
-from datetime import datetime
+import bz2
+import csv
+import glob
+import gzip
+import json
+import lzma
+import mmap
+import time
+import errno
+import heapq
+import fnmatch
+import locale
+from collections import Counter, OrderedDict, deque
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
 
-def analizar_logs(ruta_archivo):
+# Esta expresión regular divide cada línea en tres grupos: fecha, nivel del log y mensaje.
+PATRON_LINEA = r'\[(.*?)\] \[(.*?)\] (.*)'
+
+# Versión precompilada en bytes, para aplicar con finditer sobre bloques grandes
+# sin decodificar las líneas. Los espacios al principio y al final de la línea
+# se ignoran, igual que al aplicar PATRON_LINEA sobre linea.strip().
+# Para este formato el analizador usa separar_lineas(), que acepta las mismas
+# líneas pero es más rápido.
+PATRON_LINEA_BYTES = re.compile(rb'^[ \t\r\f\v]*\[(.*?)\] \[(.*?)\] (.*\S)[ \t\r\f\v]*$', re.MULTILINE)
+
+# Formato del módulo logging que usan AutomatizadorTareas ('%(asctime)s - %(levelname)s - %(message)s')
+# y DescargadorConcurrente (con '%(name)s - ' antes del nivel). Mismos grupos: fecha, nivel y mensaje.
+PATRON_ASCTIME_BYTES = re.compile(
+    rb'^[ \t\r\f\v]*(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (?:.*? - )?'
+    rb'(DEBUG|INFO|WARNING|ERROR|CRITICAL) - (.*\S)[ \t\r\f\v]*$',
+    re.MULTILINE
+)
+
+# Fragmento mínimo al dividir un archivo entre procesos; por debajo de esto
+# no compensa el costo de repartir el trabajo
+TAMANO_MINIMO_FRAGMENTO = 1024 * 1024
+
+# Logs rotados comprimidos que se leen descomprimiendo al vuelo
+EXTENSIONES_COMPRIMIDAS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+
+# Tamaño de lectura para archivos que no se pueden mapear en memoria
+TAMANO_BLOQUE = 4 * 1024 * 1024
+
+# Formato de fecha de app_server.log y formato asctime del módulo logging
+# (el que escriben AutomatizadorTareas y DescargadorConcurrente)
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+FORMATO_ASCTIME = '%Y-%m-%d %H:%M:%S,%f'
+
+# Caché de prefijos 'AAAA-MM-DD HH:MM' ya convertidos. En un log ordenado casi
+# todas las líneas comparten minuto con la anterior, así que basta con pocas entradas.
+TAMANO_CACHE_MINUTOS = 4096
+_cache_minutos = {}
+
+
+def parsear_fecha(fecha_str):
     """
-    Analiza un archivo de log y genera estadísticas.
+    Convierte una fecha 'AAAA-MM-DD HH:MM:SS' (o asctime 'AAAA-MM-DD HH:MM:SS,mmm')
+    en datetime. Devuelve None si la fecha no es válida.
+
+    Camino rápido: el prefijo hasta los minutos se busca en una caché y los
+    segundos (y milisegundos) se convierten con int(). Sólo las fechas que no
+    tienen exactamente ese formato pasan por datetime.strptime.
     """
+    largo = len(fecha_str)
+    if (largo == 19 or (largo == 23 and fecha_str[19] == ',')) and fecha_str[16] == ':':
+        prefijo = fecha_str[:16]
+        campos = _cache_minutos.get(prefijo)
+        if campos is None:
+            try:
+                base = datetime.strptime(prefijo, '%Y-%m-%d %H:%M')
+            except ValueError:
+                pass
+            else:
+                campos = (base.year, base.month, base.day, base.hour, base.minute)
+                if len(_cache_minutos) >= TAMANO_CACHE_MINUTOS:
+                    _cache_minutos.clear()
+                _cache_minutos[prefijo] = campos
 
-    # Esta expresión regular divide cada línea en tres grupos: fecha, nivel del log y mensaje.
-    patron = r'\[(.*?)\] \[(.*?)\] (.*)'
+        segundos = fecha_str[17:19]
+        if campos is not None and segundos.isdigit() and segundos.isascii() and segundos < '60':
+            # El constructor posicional es bastante más rápido que datetime.replace()
+            anio, mes, dia, hora, minuto = campos
+            if largo == 19:
+                return datetime(anio, mes, dia, hora, minuto, int(segundos))
+            milisegundos = fecha_str[20:]
+            if milisegundos.isdigit() and milisegundos.isascii():
+                return datetime(anio, mes, dia, hora, minuto, int(segundos), int(milisegundos) * 1000)
 
-    #niveles: Contabiliza cuántas veces aparece cada nivel (ERROR, INFO, WARNING)
-    #errores: Registra los mensajes de error específicos y su frecuencia
-    #fechas: Guarda todas las fechas para análisis temporal
+    # Camino lento para cualquier otra variante
+    for formato in (FORMATO_FECHA, FORMATO_ASCTIME):
+        try:
+            return datetime.strptime(fecha_str, formato)
+        except ValueError:
+            pass
+    return None
 
-    niveles = Counter()
-    errores = Counter()
-    fechas = []
 
-    try:
-        with open(ruta_archivo, 'r') as archivo:
-            for linea in archivo:
-                match = re.match(patron, linea.strip())
-                if match:
-                    fecha_str, nivel, mensaje = match.groups()
-
-                    # Contador niveles
-                    niveles[nivel] += 1
-
-                    # Contador mensajes de error
-                    if nivel == "ERROR":  # corregido "ERRROR"
-                        errores[mensaje] += 1
-
-                    # Guardar fechas para análisis
-                    try:
-                        fecha = datetime.strptime(fecha_str, '%Y-%m-%d %H:%M:%S')
-                        fechas.append(fecha)
-                    except ValueError:
-                        pass
+# Duración en segundos de cada granularidad del histograma temporal
+GRANULARIDADES = {
+    'minuto': 60,
+    'hora': 3600,
+}
+
+
+def truncar_fecha(fecha, granularidad):
+    """Trunca una fecha al inicio de su minuto u hora."""
+    if granularidad == 'minuto':
+        return datetime(fecha.year, fecha.month, fecha.day, fecha.hour, fecha.minute)
+    if granularidad == 'hora':
+        return datetime(fecha.year, fecha.month, fecha.day, fecha.hour)
+    raise ValueError(f"Granularidad no soportada: {granularidad}")
+
+
+class EstadisticasTiempo:
+    """
+    Estadísticas temporales en memoria acotada.
+    En lugar de guardar cada fecha, mantiene el primer y último registro
+    (mínimo y máximo, por si el log no está ordenado) y un histograma de
+    eventos por minuto y/o por hora. La memoria depende de la cantidad de
+    intervalos, no de la cantidad de líneas.
+    """
+
+    def __init__(self, granularidades=('minuto', 'hora')):
+        for granularidad in granularidades:
+            if granularidad not in GRANULARIDADES:
+                raise ValueError(f"Granularidad no soportada: {granularidad}")
+        self.total = 0
+        self.primero = None
+        self.ultimo = None
+        self.histogramas = {granularidad: Counter() for granularidad in granularidades}
+        # Intervalo actual de cada granularidad: en un log ordenado casi todas
+        # las fechas caen en el mismo intervalo que la anterior
+        self._actuales = {}
+
+    def agregar(self, fecha, cantidad=1):
+        """Registra 'cantidad' eventos ocurridos en la fecha indicada."""
+        self.total += cantidad
+        if self.primero is None or fecha < self.primero:
+            self.primero = fecha
+        if self.ultimo is None or fecha > self.ultimo:
+            self.ultimo = fecha
+        for granularidad, histograma in self.histogramas.items():
+            inicio, fin = self._actuales.get(granularidad, (None, None))
+            if inicio is None or not inicio <= fecha < fin:
+                inicio = truncar_fecha(fecha, granularidad)
+                fin = inicio + timedelta(seconds=GRANULARIDADES[granularidad])
+                self._actuales[granularidad] = (inicio, fin)
+            histograma[inicio] += cantidad
+
+    def combinar(self, otro):
+        """Incorpora las estadísticas de otro objeto EstadisticasTiempo."""
+        self.total += otro.total
+        if otro.primero is not None and (self.primero is None or otro.primero < self.primero):
+            self.primero = otro.primero
+        if otro.ultimo is not None and (self.ultimo is None or otro.ultimo > self.ultimo):
+            self.ultimo = otro.ultimo
+        for granularidad, histograma in otro.histogramas.items():
+            self.histogramas.setdefault(granularidad, Counter()).update(histograma)
+
+    def duracion(self):
+        """Devuelve el tiempo transcurrido entre el primer y el último registro."""
+        if self.primero is None:
+            return None
+        return self.ultimo - self.primero
+
+    def serie_tasa(self, granularidad='minuto', rellenar=True):
+        """
+        Devuelve la serie [(inicio_intervalo, eventos, eventos_por_segundo), ...]
+        ordenada por tiempo, lista para graficar.
+        Con rellenar=True los intervalos sin eventos aparecen con 0.
+        """
+        if granularidad not in self.histogramas:
+            raise ValueError(f"No se calculó el histograma por {granularidad}")
+
+        histograma = self.histogramas[granularidad]
+        segundos = GRANULARIDADES[granularidad]
+        if not histograma:
+            return []
+
+        if rellenar:
+            paso = timedelta(seconds=segundos)
+            intervalo = min(histograma)
+            final = max(histograma)
+            intervalos = []
+            while intervalo <= final:
+                intervalos.append(intervalo)
+                intervalo += paso
+        else:
+            intervalos = sorted(histograma)
+
+        return [(intervalo, histograma[intervalo], histograma[intervalo] / segundos)
+                for intervalo in intervalos]
+
+    def a_dict(self):
+        """Convierte las estadísticas a un diccionario serializable en JSON."""
+        return {
+            'total': self.total,
+            'primero': self.primero.isoformat() if self.primero else None,
+            'ultimo': self.ultimo.isoformat() if self.ultimo else None,
+            'histogramas': {
+                granularidad: {intervalo.isoformat(): eventos for intervalo, eventos in histograma.items()}
+                for granularidad, histograma in self.histogramas.items()
+            }
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Reconstruye las estadísticas a partir de lo devuelto por a_dict()."""
+        tiempo = cls(tuple(datos['histogramas']))
+        tiempo.total = datos['total']
+        tiempo.primero = datetime.fromisoformat(datos['primero']) if datos['primero'] else None
+        tiempo.ultimo = datetime.fromisoformat(datos['ultimo']) if datos['ultimo'] else None
+        for granularidad, histograma in datos['histogramas'].items():
+            tiempo.histogramas[granularidad] = Counter(
+                {datetime.fromisoformat(intervalo): eventos for intervalo, eventos in histograma.items()}
+            )
+        return tiempo
+
+
+# Tokens variables que se enmascaran para agrupar mensajes en plantillas.
+# El orden importa: primero los patrones más específicos.
+PATRONES_VARIABLES = [
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'), '<UUID>'),
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'), '<IP>'),
+    (re.compile(r'(?<![\w.])(?:[A-Za-z]:)?[\\/](?:[\w.\-]+[\\/]?)+'), '<RUTA>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{16,}\b'), '<HEX>'),
+    (re.compile(r'"[^"]*"|\'[^\']*\''), '<TEXTO>'),
+    (re.compile(r'(?<![A-Za-z_])[-+]?\d+(?:\.\d+)?'), '<NUM>'),
+]
+
+COMODIN = '<*>'
 
-        # Mostrar informe solo una vez, después de procesar todo
-        print("=== INFORME DE ANÁLISIS DE LOG ===")
-        print(f"Total de líneas procesadas: {sum(niveles.values())}")
 
-        print("\nDistribución por nivel:")
-        for nivel, count in niveles.most_common():
-            print(f"  {nivel}: {count}")
+def normalizar_mensaje(mensaje):
+    """
+    Reemplaza los tokens variables (UUIDs, IPs, rutas, hexadecimales, textos
+    entre comillas y números) por marcadores, para que mensajes que sólo
+    difieren en esos datos compartan la misma clave.
+    """
+    for patron, marcador in PATRONES_VARIABLES:
+        mensaje = patron.sub(marcador, mensaje)
+    return mensaje
+
+
+class MineroPlantillas:
+    """
+    Agrupa mensajes normalizados en plantillas, con una versión simplificada de Drain.
+
+    Los mensajes se separan por cantidad de tokens y primer token; dentro de cada
+    grupo se busca la plantilla más parecida (proporción de tokens iguales). Si
+    supera el umbral de similitud, las posiciones distintas pasan a ser '<*>'; si
+    no, el mensaje inicia una plantilla nueva. Se conservan como máximo
+    max_plantillas, descartando las usadas hace más tiempo.
+    """
+
+    def __init__(self, similitud=0.5, max_plantillas=5000):
+        self.similitud = similitud
+        self.max_plantillas = max_plantillas
+        self.grupos = {}
+        self.recientes = OrderedDict()
+
+    def agregar(self, mensaje):
+        """
+        Devuelve (plantilla, plantilla_anterior). plantilla_anterior es distinta
+        de None cuando el mensaje generalizó una plantilla existente.
+        """
+        tokens = normalizar_mensaje(mensaje).split()
+        if not tokens:
+            return '', None
 
-        print("\nMensajes de ERROR más frecuentes:")
-        for mensaje, count in errores.most_common(5):
-            print(f"  [{count}] {mensaje}")
+        clave = (len(tokens), tokens[0])
+        candidatas = self.grupos.setdefault(clave, [])
 
-        if fechas:
-            print(f"\nPrimer registro: {min(fechas)}")
-            print(f"Último registro: {max(fechas)}")
-            print(f"Duración del log: {max(fechas) - min(fechas)}")
+        mejor, mejor_similitud = None, -1.0
+        for candidata in candidatas:
+            iguales = sum(1 for a, b in zip(candidata, tokens) if a == b or a == COMODIN)
+            similitud = iguales / len(tokens)
+            if similitud > mejor_similitud:
+                mejor, mejor_similitud = candidata, similitud
 
+        if mejor is not None and mejor_similitud >= self.similitud:
+            anterior = ' '.join(mejor)
+            for i, (a, b) in enumerate(zip(mejor, tokens)):
+                if a != b and a != COMODIN:
+                    mejor[i] = COMODIN
+            plantilla = ' '.join(mejor)
+            if plantilla != anterior:
+                del self.recientes[anterior]
+                if plantilla in self.recientes:
+                    # Quedó igual a otra plantilla del grupo: se fusionan
+                    candidatas.remove(mejor)
+                    self.recientes.move_to_end(plantilla)
+                else:
+                    self.recientes[plantilla] = clave
+                return plantilla, anterior
+            self.recientes.move_to_end(plantilla)
+            return plantilla, None
+
+        candidatas.append(tokens)
+        plantilla = ' '.join(tokens)
+        self.recientes[plantilla] = clave
+        if len(self.recientes) > self.max_plantillas:
+            self._descartar_mas_antigua()
+        return plantilla, None
+
+    def _descartar_mas_antigua(self):
+        plantilla, clave = self.recientes.popitem(last=False)
+        tokens = plantilla.split()
+        candidatas = self.grupos[clave]
+        candidatas.remove(tokens)
+        if not candidatas:
+            del self.grupos[clave]
+
+    def plantillas(self):
+        """Devuelve las plantillas conocidas, de la menos a la más reciente."""
+        return list(self.recientes)
+
+    def a_dict(self):
+        """
+        Estado del minero serializable en JSON: las plantillas de cada grupo en
+        su orden (decide los empates de similitud) y el orden de uso.
+        """
         return {
-            'niveles': niveles,
+            'similitud': self.similitud,
+            'max_plantillas': self.max_plantillas,
+            'grupos': [[' '.join(tokens) for tokens in candidatas] for candidatas in self.grupos.values()],
+            'plantillas': self.plantillas()
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """
+        Reconstruye el minero tal como quedó, sin volver a pasar las plantillas
+        por agregar() (que podría fusionarlas).
+        """
+        minero = cls(datos['similitud'], datos['max_plantillas'])
+        for plantillas in datos['grupos']:
+            for plantilla in plantillas:
+                tokens = plantilla.split()
+                minero.grupos.setdefault((len(tokens), tokens[0]), []).append(tokens)
+        for plantilla in datos['plantillas']:
+            tokens = plantilla.split()
+            minero.recientes[plantilla] = (len(tokens), tokens[0])
+        return minero
+
+
+class TopKAproximado:
+    """
+    Contador de elementos más frecuentes en memoria fija (algoritmo Space-Saving).
+
+    Mantiene como mucho 'capacidad' claves. Cuando llega una clave nueva y no hay
+    lugar, reemplaza a la de menor cuenta y hereda esa cuenta como error máximo.
+    'cota_ausentes' es lo máximo que pudo haber aparecido una clave que no está
+    en el resumen (la mayor cuenta descartada). Toda clave con frecuencia real
+    mayor que total/capacidad está garantizada en el resumen. Ofrece
+    most_common(), items() y values() como un Counter.
+    """
+
+    def __init__(self, capacidad=1000):
+        self.capacidad = capacidad
+        self.cuentas = {}
+        self.errores = {}
+        self.cota_ausentes = 0
+        # Montículo de (cuenta, clave); puede tener cuentas desactualizadas
+        # (más bajas), que se corrigen al buscar el mínimo.
+        self._monticulo = []
+
+    @classmethod
+    def desde_cuentas(cls, capacidad, cuentas, errores=None, cota_ausentes=0):
+        """Arma el resumen con las cuentas y errores máximos dados, tal cual."""
+        topk = cls(capacidad)
+        topk.cota_ausentes = cota_ausentes
+        topk.cuentas = dict(cuentas)
+        topk.errores = {clave: (errores or {}).get(clave, 0) for clave in topk.cuentas}
+        topk._monticulo = [(cuenta, clave) for clave, cuenta in topk.cuentas.items()]
+        heapq.heapify(topk._monticulo)
+        return topk
+
+    def agregar(self, clave, cantidad=1, error=0):
+        """
+        Suma 'cantidad' apariciones de la clave. 'error' es cuánto de esa
+        cantidad puede estar sobreestimado (al combinar otro resumen).
+        """
+        if clave in self.cuentas:
+            self.cuentas[clave] += cantidad
+            self.errores[clave] += error
+            return
+
+        if len(self.cuentas) >= self.capacidad:
+            # Buscar la clave de menor cuenta, corrigiendo entradas desactualizadas
+            while True:
+                cuenta, minima = self._monticulo[0]
+                if cuenta == self.cuentas[minima]:
+                    break
+                heapq.heapreplace(self._monticulo, (self.cuentas[minima], minima))
+            heapq.heappop(self._monticulo)
+            self.cota_ausentes = max(self.cota_ausentes, self.cuentas.pop(minima))
+            del self.errores[minima]
+
+        # La clave pudo haber estado antes y haber sido descartada
+        self.cuentas[clave] = self.cota_ausentes + cantidad
+        self.errores[clave] = self.cota_ausentes + error
+        heapq.heappush(self._monticulo, (self.cuentas[clave], clave))
+
+    def renombrar(self, anterior, nueva):
+        """Mueve la cuenta de una clave a otra (por ejemplo, al generalizar una plantilla)."""
+        if anterior not in self.cuentas:
+            return
+        cuenta = self.cuentas.pop(anterior)
+        error = self.errores.pop(anterior)
+        self._monticulo = [(c, k) for c, k in self._monticulo if k != anterior]
+        heapq.heapify(self._monticulo)
+        if nueva in self.cuentas:
+            self.cuentas[nueva] += cuenta
+            self.errores[nueva] += error
+        else:
+            self.cuentas[nueva] = cuenta
+            self.errores[nueva] = error
+            heapq.heappush(self._monticulo, (cuenta, nueva))
+
+    def combinar(self, otro):
+        """
+        Incorpora las cuentas de otro TopKAproximado, sumando también sus
+        errores máximos. Una clave que falta en uno de los resúmenes pudo haber
+        aparecido ahí hasta su cota_ausentes, que se suma a la cuenta y al
+        error; después se conservan las 'capacidad' claves de mayor cuenta.
+        """
+        minimos = (self.cota_ausentes, otro.cota_ausentes)
+        cota_ausentes = sum(minimos)
+        cuentas, errores = {}, {}
+        for clave in list(self.cuentas) + [clave for clave in otro.cuentas if clave not in self.cuentas]:
+            cuentas[clave] = self.cuentas.get(clave, minimos[0]) + otro.cuentas.get(clave, minimos[1])
+            errores[clave] = self.errores.get(clave, minimos[0]) + otro.errores.get(clave, minimos[1])
+        if len(cuentas) > self.capacidad:
+            conservadas = set(heapq.nlargest(self.capacidad, cuentas, key=cuentas.get))
+            cota_ausentes = max([cota_ausentes] + [cuenta for clave, cuenta in cuentas.items() if clave not in conservadas])
+            cuentas = {clave: cuenta for clave, cuenta in cuentas.items() if clave in conservadas}
+        self.cota_ausentes = cota_ausentes
+        self.cuentas = cuentas
+        self.errores = {clave: errores[clave] for clave in cuentas}
+        self._monticulo = [(cuenta, clave) for clave, cuenta in cuentas.items()]
+        heapq.heapify(self._monticulo)
+
+    def most_common(self, n=None):
+        """Devuelve [(clave, cuenta), ...] de mayor a menor, como Counter.most_common()."""
+        if n is None:
+            return sorted(self.cuentas.items(), key=lambda x: x[1], reverse=True)
+        return heapq.nlargest(n, self.cuentas.items(), key=lambda x: x[1])
+
+    def items(self):
+        return self.cuentas.items()
+
+    def values(self):
+        return self.cuentas.values()
+
+    def __len__(self):
+        return len(self.cuentas)
+
+    def __contains__(self, clave):
+        return clave in self.cuentas
+
+    def __getitem__(self, clave):
+        return self.cuentas.get(clave, 0)
+
+
+class AcumuladorLog:
+    """Acumula las estadísticas de un log (o de un fragmento) y permite combinarlas."""
+
+    def __init__(self, guardar_fechas=True, agrupar_errores=False, capacidad_errores=1000):
+        #niveles: Contabiliza cuántas veces aparece cada nivel (ERROR, INFO, WARNING)
+        #errores: Registra los mensajes de error específicos y su frecuencia
+        #fechas: Guarda todas las fechas para análisis temporal
+        #tiempo: Alternativa a fechas en memoria acotada (guardar_fechas=False)
+        #minero: Con agrupar_errores=True, los errores se cuentan por plantilla
+        #        en un TopKAproximado de tamaño fijo en lugar de un Counter
+        self.niveles = Counter()
+        self.fechas = [] if guardar_fechas else None
+        self.tiempo = None if guardar_fechas else EstadisticasTiempo()
+        if agrupar_errores:
+            self.errores = TopKAproximado(capacidad_errores)
+            self.minero = MineroPlantillas()
+        else:
+            self.errores = Counter()
+            self.minero = None
+
+    def contar_error(self, mensaje, cantidad=1, error=0):
+        """
+        Cuenta un mensaje de error, agrupándolo por plantilla si corresponde.
+        'error' es el error máximo de 'cantidad' (ver TopKAproximado.agregar).
+        """
+        if self.minero is None:
+            self.errores[mensaje] += cantidad
+            return
+        plantilla, anterior = self.minero.agregar(mensaje)
+        if anterior is not None:
+            self.errores.renombrar(anterior, plantilla)
+        self.errores.agregar(plantilla, cantidad, error)
+
+    def procesar_bytes(self, bloque, codificacion=None, patron=PATRON_LINEA_BYTES):
+        """
+        Procesa un bloque de líneas en bytes sin decodificarlas enteras: sólo
+        se decodifican las fechas distintas, los niveles distintos y los
+        mensajes de ERROR, que son los que se guardan.
+        patron: PATRON_LINEA_BYTES o PATRON_ASCTIME_BYTES (ver detectar_formato).
+        """
+        codificacion = codificacion or locale.getpreferredencoding(False)
+        contar_error = self.contar_error
+        niveles = Counter()
+
+        # Las líneas consecutivas con la misma fecha se registran juntas,
+        # sin volver a decodificar ni convertir la fecha
+        ultima_fecha = None
+        fecha = None
+        repeticiones = 0
+
+        for fecha_bytes, nivel, mensaje in separar_campos(bloque, patron):
+            # Contador niveles (se decodifican una sola vez al final)
+            niveles[nivel] += 1
+
+            # Contador mensajes de error
+            if nivel == b"ERROR":
+                contar_error(mensaje.rstrip().decode(codificacion))
+
+            # Guardar fechas para análisis
+            if fecha_bytes != ultima_fecha:
+                if fecha is not None:
+                    self.registrar_fecha(fecha, repeticiones)
+                ultima_fecha = fecha_bytes
+                fecha = parsear_fecha(fecha_bytes.decode(codificacion))
+                repeticiones = 0
+            repeticiones += 1
+
+        if fecha is not None:
+            self.registrar_fecha(fecha, repeticiones)
+
+        for nivel, cantidad in niveles.items():
+            self.niveles[nivel.decode(codificacion)] += cantidad
+
+    def registrar_fecha(self, fecha, cantidad=1):
+        """Registra 'cantidad' líneas con la fecha indicada."""
+        if self.tiempo is None:
+            self.fechas.extend([fecha] * cantidad)
+        else:
+            self.tiempo.agregar(fecha, cantidad)
+
+    def combinar(self, otro):
+        """
+        Incorpora los resultados de otro acumulador.
+        Los fragmentos deben combinarse en el orden del archivo para que el
+        resultado sea idéntico al del recorrido secuencial.
+        """
+        # update() respeta el orden de inserción, así los empates de most_common()
+        # se resuelven igual que en el recorrido secuencial.
+        self.niveles.update(otro.niveles)
+        if self.minero is None:
+            self.errores.update(otro.errores)
+        else:
+            # Las plantillas del otro acumulador se vuelven a pasar por este minero
+            for plantilla, cuenta in otro.errores.items():
+                self.contar_error(plantilla, cuenta, otro.errores.errores[plantilla])
+        if self.tiempo is None:
+            self.fechas.extend(otro.fechas)
+        else:
+            self.tiempo.combinar(otro.tiempo)
+
+    def resultado(self, archivos=None):
+        """Devuelve un ResultadoLog con los contadores acumulados."""
+        return ResultadoLog(self.niveles, self.errores, fechas=self.fechas, tiempo=self.tiempo,
+                            archivos=archivos)
+
+    def a_dict(self):
+        """
+        Convierte el acumulador a un diccionario serializable en JSON.
+        Sólo está soportado en modo de memoria acotada (guardar_fechas=False).
+        """
+        if self.tiempo is None:
+            raise ValueError("Sólo se puede serializar un acumulador creado con guardar_fechas=False")
+        datos = {
+            'niveles': dict(self.niveles),
+            'errores': dict(self.errores.items()),
+            'tiempo': self.tiempo.a_dict()
+        }
+        if self.minero is not None:
+            datos['capacidad_errores'] = self.errores.capacidad
+            datos['errores_maximos'] = dict(self.errores.errores)
+            datos['cota_errores_ausentes'] = self.errores.cota_ausentes
+            datos['minero'] = self.minero.a_dict()
+        return datos
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Reconstruye un acumulador a partir de lo devuelto por a_dict()."""
+        agrupar_errores = 'minero' in datos
+        acumulador = cls(guardar_fechas=False, agrupar_errores=agrupar_errores,
+                         capacidad_errores=datos.get('capacidad_errores', 1000))
+        acumulador.niveles = Counter(datos['niveles'])
+        acumulador.tiempo = EstadisticasTiempo.desde_dict(datos['tiempo'])
+        if agrupar_errores:
+            acumulador.minero = MineroPlantillas.desde_dict(datos['minero'])
+            acumulador.errores = TopKAproximado.desde_cuentas(
+                acumulador.errores.capacidad, datos['errores'], datos['errores_maximos'],
+                datos['cota_errores_ausentes'])
+        else:
+            acumulador.errores = Counter(datos['errores'])
+        return acumulador
+
+
+class ResultadoLog:
+    """
+    Resultado de un análisis de log, con exportación y consultas.
+
+    Se puede seguir usando como el diccionario que devolvía analizar_logs
+    (resultado['niveles'], resultado['errores'], resultado['fechas'] o
+    resultado['tiempo']), pero además ofrece consultas (top por nivel, por
+    ventana de tiempo y por plantilla) y exportación a JSON, CSV y columnas,
+    para que otros programas lean los agregados sin volver a analizar el log.
+    """
+
+    def __init__(self, niveles, errores, fechas=None, tiempo=None, archivos=None, por_archivo=None):
+        self.niveles = niveles
+        self.errores = errores
+        self.fechas = fechas
+        self._tiempo = tiempo
+        self.archivos = archivos or []
+        self.por_archivo = por_archivo
+
+    # --- Compatibilidad con el diccionario clásico ---
+
+    def keys(self):
+        claves = ['niveles', 'errores', 'fechas' if self.fechas is not None else 'tiempo', 'archivos']
+        if self.por_archivo is not None:
+            claves.append('por_archivo')
+        return claves
+
+    def __contains__(self, clave):
+        return clave in self.keys()
+
+    def __getitem__(self, clave):
+        if clave not in self.keys():
+            raise KeyError(clave)
+        return getattr(self, clave)
+
+    def get(self, clave, defecto=None):
+        return self[clave] if clave in self else defecto
+
+    # --- Datos derivados ---
+
+    @property
+    def tiempo(self):
+        """EstadisticasTiempo del resultado (se calcula a partir de 'fechas' si hace falta)."""
+        if self._tiempo is None and self.fechas is not None:
+            tiempo = EstadisticasTiempo()
+            for fecha in self.fechas:
+                tiempo.agregar(fecha)
+            self._tiempo = tiempo
+        return self._tiempo
+
+    @property
+    def total_lineas(self):
+        return sum(self.niveles.values())
+
+    @property
+    def primero(self):
+        if self._tiempo is None and self.fechas is not None:
+            return min(self.fechas) if self.fechas else None
+        return self.tiempo.primero
+
+    @property
+    def ultimo(self):
+        if self._tiempo is None and self.fechas is not None:
+            return max(self.fechas) if self.fechas else None
+        return self.tiempo.ultimo
+
+    # --- Consultas ---
+
+    def top_niveles(self, n=None):
+        """Los n niveles con más líneas: [(nivel, cuenta), ...]."""
+        return self.niveles.most_common(n)
+
+    def top_errores(self, n=5, plantilla=None):
+        """
+        Los n mensajes (o plantillas) de ERROR más frecuentes. Con 'plantilla'
+        (patrón estilo fnmatch, por ejemplo 'Database*') se filtran los mensajes.
+        """
+        if plantilla is None:
+            return self.errores.most_common(n)
+        coincidencias = [(mensaje, cuenta) for mensaje, cuenta in self.errores.items()
+                         if fnmatch.fnmatchcase(mensaje, plantilla)]
+        return heapq.nlargest(n, coincidencias, key=lambda x: x[1])
+
+    def contar_errores(self, plantilla):
+        """Total de errores cuyos mensajes coinciden con el patrón."""
+        return sum(cuenta for mensaje, cuenta in self.errores.items()
+                   if fnmatch.fnmatchcase(mensaje, plantilla))
+
+    def eventos_en_ventana(self, inicio, fin, granularidad='minuto'):
+        """
+        Cantidad de líneas con fecha en [inicio, fin). Si sólo hay histogramas,
+        se cuentan los intervalos de la granularidad indicada que empiezan en la ventana.
+        """
+        if self._tiempo is None and self.fechas is not None:
+            return sum(1 for fecha in self.fechas if inicio <= fecha < fin)
+        histograma = self.tiempo.histogramas[granularidad]
+        return sum(eventos for intervalo, eventos in histograma.items() if inicio <= intervalo < fin)
+
+    def serie(self, granularidad='minuto', rellenar=True):
+        """Serie de eventos por intervalo (ver EstadisticasTiempo.serie_tasa)."""
+        return self.tiempo.serie_tasa(granularidad, rellenar)
+
+    # --- Exportación ---
+
+    def a_dict(self):
+        """
+        Diccionario compacto y serializable en JSON. En lugar de la lista de
+        fechas se exportan el primer/último registro y los histogramas.
+        """
+        tiempo = self.tiempo
+        errores = []
+        for mensaje, cuenta in self.errores.most_common():
+            fila = {'mensaje': mensaje, 'cuenta': cuenta}
+            if isinstance(self.errores, TopKAproximado):
+                fila['error_maximo'] = self.errores.errores[mensaje]
+            errores.append(fila)
+
+        datos = {
+            'archivos': self.archivos,
+            'total_lineas': self.total_lineas,
+            'niveles': dict(self.niveles.most_common()),
             'errores': errores,
-            'fechas': fechas
+            'primer_registro': self.primero.isoformat() if self.primero else None,
+            'ultimo_registro': self.ultimo.isoformat() if self.ultimo else None,
+            # Líneas con fecha válida (total_lineas cuenta también las que no la tienen)
+            'total_fechas': tiempo.total if tiempo else 0,
+            'histogramas': {
+                granularidad: [[intervalo.isoformat(), eventos] for intervalo, eventos in sorted(histograma.items())]
+                for granularidad, histograma in tiempo.histogramas.items()
+            } if tiempo else {}
         }
+        if isinstance(self.errores, TopKAproximado):
+            # Para reconstruir el resumen con sus cotas de error (ver desde_dict)
+            datos['resumen_errores'] = {
+                'capacidad': self.errores.capacidad,
+                'cota_ausentes': self.errores.cota_ausentes
+            }
+        if self.por_archivo is not None:
+            datos['por_archivo'] = {ruta: parcial.a_dict() for ruta, parcial in self.por_archivo.items()}
+        return datos
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Reconstruye un resultado exportado con a_dict() o a_json()."""
+        tiempo = EstadisticasTiempo(tuple(datos['histogramas']))
+        tiempo.primero = datetime.fromisoformat(datos['primer_registro']) if datos['primer_registro'] else None
+        tiempo.ultimo = datetime.fromisoformat(datos['ultimo_registro']) if datos['ultimo_registro'] else None
+        for granularidad, serie in datos['histogramas'].items():
+            tiempo.histogramas[granularidad] = Counter(
+                {datetime.fromisoformat(intervalo): eventos for intervalo, eventos in serie}
+            )
+        tiempo.total = datos['total_fechas']
+
+        por_archivo = None
+        if 'por_archivo' in datos:
+            por_archivo = {ruta: cls.desde_dict(parcial) for ruta, parcial in datos['por_archivo'].items()}
+
+        if 'resumen_errores' in datos:
+            errores = TopKAproximado.desde_cuentas(
+                datos['resumen_errores']['capacidad'],
+                {fila['mensaje']: fila['cuenta'] for fila in datos['errores']},
+                {fila['mensaje']: fila['error_maximo'] for fila in datos['errores']},
+                datos['resumen_errores']['cota_ausentes']
+            )
+        else:
+            errores = Counter({fila['mensaje']: fila['cuenta'] for fila in datos['errores']})
+
+        return cls(
+            Counter(datos['niveles']),
+            errores,
+            tiempo=tiempo,
+            archivos=datos['archivos'],
+            por_archivo=por_archivo
+        )
+
+    def a_json(self, ruta_salida=None):
+        """Devuelve el resultado como JSON y, si se indica una ruta, lo guarda."""
+        texto = json.dumps(self.a_dict(), ensure_ascii=False, indent=2)
+        if ruta_salida:
+            with open(ruta_salida, 'w', encoding='utf-8') as f:
+                f.write(texto)
+        return texto
+
+    @classmethod
+    def desde_json(cls, ruta_archivo):
+        """Carga un resultado guardado con a_json()."""
+        with open(ruta_archivo, 'r', encoding='utf-8') as f:
+            return cls.desde_dict(json.load(f))
+
+    def a_columnas(self):
+        """
+        Devuelve las tablas del resultado en formato columnar:
+        {'niveles': {'nivel': [...], 'cuenta': [...]}, 'errores': {...},
+         'serie_minuto': {'inicio': [...], 'eventos': [...]}, ...}
+        """
+        tablas = {
+            'niveles': {
+                'nivel': [nivel for nivel, _ in self.niveles.most_common()],
+                'cuenta': [cuenta for _, cuenta in self.niveles.most_common()]
+            },
+            'errores': {
+                'mensaje': [mensaje for mensaje, _ in self.errores.most_common()],
+                'cuenta': [cuenta for _, cuenta in self.errores.most_common()]
+            }
+        }
+        if self.tiempo:
+            for granularidad, histograma in self.tiempo.histogramas.items():
+                intervalos = sorted(histograma)
+                tablas[f'serie_{granularidad}'] = {
+                    'inicio': intervalos,
+                    'eventos': [histograma[intervalo] for intervalo in intervalos]
+                }
+        return tablas
+
+    def a_csv(self, ruta_salida):
+        """
+        Guarda el resultado en un CSV en formato largo (seccion, clave, valor),
+        fácil de filtrar en una planilla o de cargar en un dashboard.
+        """
+        with open(ruta_salida, 'w', newline='', encoding='utf-8') as archivo_csv:
+            escritor = csv.writer(archivo_csv)
+            escritor.writerow(['seccion', 'clave', 'valor'])
+            for tabla, columnas in self.a_columnas().items():
+                claves, valores = list(columnas.values())
+                for clave, valor in zip(claves, valores):
+                    if isinstance(clave, datetime):
+                        clave = clave.isoformat()
+                    escritor.writerow([tabla, clave, valor])
+
+    def a_parquet(self, directorio_salida):
+        """
+        Guarda cada tabla de a_columnas() como '<tabla>.parquet' en el directorio.
+        Requiere pyarrow (pip install pyarrow).
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(directorio_salida, exist_ok=True)
+        for tabla, columnas in self.a_columnas().items():
+            pq.write_table(pa.table(columnas), os.path.join(directorio_salida, f'{tabla}.parquet'))
+
+
+ESPACIOS = b' \t\n\r\x0b\x0c'
+
+
+def separar_lineas(bloque):
+    """
+    Separa un bloque de bytes con formato [FECHA] [NIVEL] MENSAJE en tuplas
+    (fecha, nivel, mensaje), con split() y partition() en lugar de una regex y
+    sin copiar cada línea con strip(). Acepta las mismas líneas que
+    PATRON_LINEA_BYTES; el mensaje puede conservar espacios al final.
+    """
+    for linea in bloque.split(b'\n'):
+        if linea[:1] != b'[':
+            linea = linea.lstrip(ESPACIOS)
+            if linea[:1] != b'[':
+                continue
+        fecha, separador, resto = linea[1:].partition(b'] [')
+        if not separador:
+            continue
+        nivel, separador, mensaje = resto.partition(b'] ')
+        if separador and mensaje and not mensaje.isspace():
+            yield fecha, nivel, mensaje
+
+
+def separar_campos(bloque, patron=PATRON_LINEA_BYTES):
+    """Devuelve un iterable de (fecha, nivel, mensaje) en bytes para el formato indicado."""
+    if patron is PATRON_LINEA_BYTES:
+        return separar_lineas(bloque)
+    return (match.groups() for match in patron.finditer(bloque))
+
+
+def bloques_mapeados(mapa, inicio=0, fin=None, tamano_bloque=TAMANO_BLOQUE):
+    """Recorre mapa[inicio:fin] en bloques de unos tamano_bloque bytes que terminan en fin de línea."""
+    fin = len(mapa) if fin is None else fin
+    posicion = inicio
+    while posicion < fin:
+        corte = posicion + tamano_bloque
+        if corte < fin:
+            salto = mapa.find(b'\n', corte - 1, fin)
+            corte = fin if salto == -1 else salto + 1
+        else:
+            corte = fin
+        yield mapa[posicion:corte]
+        posicion = corte
+
+
+def es_comprimido(ruta_archivo):
+    """Indica si el log está comprimido (.gz, .bz2 o .xz)."""
+    return os.path.splitext(ruta_archivo)[1].lower() in EXTENSIONES_COMPRIMIDAS
+
+
+def abrir_log(ruta_archivo):
+    """Abre el log en binario, descomprimiéndolo al vuelo si hace falta."""
+    abrir = EXTENSIONES_COMPRIMIDAS.get(os.path.splitext(ruta_archivo)[1].lower(), open)
+    return abrir(ruta_archivo, 'rb')
+
+
+def detectar_formato(ruta_archivo, muestra=64 * 1024):
+    """
+    Devuelve el patrón en bytes que corresponde al formato del log, mirando su
+    comienzo. Si no se reconoce, se usa el formato [FECHA] [NIVEL] MENSAJE.
+    """
+    with abrir_log(ruta_archivo) as archivo:
+        return detectar_formato_bytes(archivo.read(muestra))
+
+
+def detectar_formato_bytes(muestra):
+    """Devuelve el patrón que corresponde a un bloque de bytes del log."""
+    if not PATRON_LINEA_BYTES.search(muestra) and PATRON_ASCTIME_BYTES.search(muestra):
+        return PATRON_ASCTIME_BYTES
+    return PATRON_LINEA_BYTES
+
+
+def resolver_rutas(rutas):
+    """
+    Convierte una ruta, un patrón glob ('logs/automatizador_*.log') o una lista
+    de ellos en la lista de archivos a analizar, sin repetidos. Una ruta que
+    existe se toma tal cual aunque tenga caracteres de glob ('app[1].log').
+    """
+    if isinstance(rutas, (str, os.PathLike)):
+        rutas = [rutas]
+
+    resultado = []
+    for ruta in rutas:
+        ruta = os.fspath(ruta)
+        if os.path.exists(ruta):
+            coincidencias = [ruta]
+        elif any(caracter in ruta for caracter in '*?['):
+            coincidencias = sorted(glob.glob(ruta))
+        else:
+            coincidencias = []
+        if not coincidencias:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), ruta)
+        for coincidencia in coincidencias:
+            if coincidencia not in resultado:
+                resultado.append(coincidencia)
+    return resultado
+
+
+def leer_bloques(ruta_archivo, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Genera bloques de bytes que terminan en un salto de línea, para recorrer
+    archivos que no se pueden mapear en memoria (por ejemplo, comprimidos).
+    """
+    with abrir_log(ruta_archivo) as archivo:
+        yield from leer_bloques_completos(archivo, tamano_bloque, incluir_incompleta=True)
+
+
+def leer_bloques_completos(archivo, tamano_bloque=TAMANO_BLOQUE, incluir_incompleta=False):
+    """
+    Genera bloques de bytes terminados en salto de línea desde la posición actual
+    de un archivo abierto en binario. Si la última línea no está completa (se
+    está escribiendo), se retrocede hasta su inicio para leerla más adelante,
+    salvo que incluir_incompleta sea True.
+    """
+    resto = b''
+    while True:
+        datos = archivo.read(tamano_bloque)
+        if not datos:
+            if resto:
+                if incluir_incompleta:
+                    yield resto
+                else:
+                    archivo.seek(-len(resto), os.SEEK_CUR)
+            return
+        datos = resto + datos
+        corte = datos.rfind(b'\n') + 1
+        resto = datos[corte:]
+        if corte:
+            yield datos[:corte]
+
+
+def calcular_fragmentos(ruta_archivo, num_fragmentos):
+    """
+    Divide el archivo en rangos de bytes alineados a inicios de línea.
+    Devuelve una lista de tuplas (inicio, fin).
+    """
+    tamano = os.path.getsize(ruta_archivo)
+    limites = [0]
+
+    with open(ruta_archivo, 'rb') as archivo:
+        for i in range(1, num_fragmentos):
+            # Retroceder un byte: si justo ahí termina una línea, readline()
+            # sólo consume el salto y el límite queda en el inicio de la siguiente.
+            archivo.seek(tamano * i // num_fragmentos - 1)
+            archivo.readline()
+            posicion = archivo.tell()
+            if limites[-1] < posicion < tamano:
+                limites.append(posicion)
+
+    limites.append(tamano)
+    return list(zip(limites[:-1], limites[1:]))
+
+
+def analizar_fragmento(ruta_archivo, inicio=0, fin=None, opciones=None):
+    """
+    Analiza un rango de bytes del archivo y devuelve un AcumuladorLog parcial.
+    opciones: argumentos para AcumuladorLog (guardar_fechas, agrupar_errores, ...).
+
+    Los archivos planos se mapean en memoria y se recorren como bytes en
+    bloques; los comprimidos se leen completos por bloques (inicio y fin se ignoran).
+    """
+    acumulador = AcumuladorLog(**(opciones or {}))
+    patron = detectar_formato(ruta_archivo)
+
+    if es_comprimido(ruta_archivo):
+        for bloque in leer_bloques(ruta_archivo):
+            acumulador.procesar_bytes(bloque, patron=patron)
+        return acumulador
+
+    with open(ruta_archivo, 'rb') as archivo:
+        if os.fstat(archivo.fileno()).st_size == 0:
+            # mmap no admite archivos vacíos
+            return acumulador
+        with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            for bloque in bloques_mapeados(mapa, inicio, fin):
+                acumulador.procesar_bytes(bloque, patron=patron)
+    return acumulador
+
+
+def eventos_archivo(ruta_archivo):
+    """
+    Genera (fecha, ruta, nivel, mensaje) por cada línea válida del log, sin
+    cargar el archivo entero. Las líneas con fecha ilegible toman la fecha de la
+    línea anterior para no romper el orden.
+    """
+    codificacion = locale.getpreferredencoding(False)
+    patron = detectar_formato(ruta_archivo)
+    ultima_fecha = datetime.min
+    for bloque in leer_bloques(ruta_archivo):
+        for fecha_bytes, nivel, mensaje in separar_campos(bloque, patron):
+            fecha = parsear_fecha(fecha_bytes.decode(codificacion)) or ultima_fecha
+            ultima_fecha = fecha
+            yield fecha, ruta_archivo, nivel.decode(codificacion), mensaje.rstrip().decode(codificacion)
+
+
+def eventos_ordenados(rutas):
+    """
+    Intercala los eventos de varios logs en orden cronológico con una mezcla
+    k-way (heapq.merge): sólo se mantiene en memoria un evento por archivo.
+    Cada archivo debe estar ordenado por fecha, como ocurre al escribirse.
+    """
+    iteradores = [eventos_archivo(ruta) for ruta in resolver_rutas(rutas)]
+    return heapq.merge(*iteradores, key=lambda evento: evento[0])
+
+
+def _tareas_de_analisis(rutas, procesos):
+    """
+    Reparte los archivos en tareas (ruta, inicio, fin). Los archivos planos
+    grandes se dividen en fragmentos; los comprimidos van enteros.
+    """
+    tareas = []
+    for ruta in rutas:
+        if procesos > 1 and not es_comprimido(ruta):
+            num_fragmentos = min(procesos, max(1, os.path.getsize(ruta) // TAMANO_MINIMO_FRAGMENTO))
+            tareas.extend((ruta, inicio, fin) for inicio, fin in calcular_fragmentos(ruta, num_fragmentos))
+        else:
+            tareas.append((ruta, 0, None))
+    return tareas
+
+
+def mostrar_informe(resultado):
+    """Imprime el informe resumido de un ResultadoLog."""
+    print("=== INFORME DE ANÁLISIS DE LOG ===")
+    if len(resultado.archivos) > 1:
+        print(f"Archivos analizados: {len(resultado.archivos)}")
+    print(f"Total de líneas procesadas: {resultado.total_lineas}")
+
+    print("\nDistribución por nivel:")
+    for nivel, count in resultado.top_niveles():
+        print(f"  {nivel}: {count}")
+
+    print("\nMensajes de ERROR más frecuentes:")
+    for mensaje, count in resultado.top_errores(5):
+        print(f"  [{count}] {mensaje}")
+
+    primero, ultimo = resultado.primero, resultado.ultimo
+    if primero is not None:
+        print(f"\nPrimer registro: {primero}")
+        print(f"Último registro: {ultimo}")
+        print(f"Duración del log: {ultimo - primero}")
+
+    if resultado.por_archivo is not None:
+        print("\nDesglose por archivo:")
+        for ruta, parcial in resultado.por_archivo.items():
+            detalle = ', '.join(f"{nivel}: {count}" for nivel, count in parcial.top_niveles())
+            print(f"  {ruta}: {parcial.total_lineas} líneas ({detalle})")
+
+
+def analizar_logs(ruta_archivo, procesos=1, guardar_fechas=True, agrupar_errores=False,
+                  capacidad_errores=1000, por_archivo=False):
+    """
+    Analiza un archivo de log y genera estadísticas.
+    Acepta también logs rotados comprimidos (.gz, .bz2, .xz), una lista de
+    rutas o un patrón glob como 'logs/automatizador_*.log'. Con varios archivos
+    se genera un único informe combinado.
+
+    procesos: cantidad de procesos a usar. Con 1 (por defecto) los archivos se
+    recorren de forma secuencial; con más, los archivos se analizan a la vez y
+    los grandes se dividen en fragmentos alineados a líneas. Los fragmentos se
+    combinan en orden, por lo que el resultado es idéntico al secuencial.
+    None usa todos los núcleos.
+
+    guardar_fechas: con True se devuelve la lista 'fechas' con todas las fechas
+    (con varios archivos, intercaladas en orden cronológico).
+    Con False se devuelve 'tiempo', un objeto EstadisticasTiempo con el primer y
+    último registro y los histogramas por minuto y hora, en memoria acotada.
+
+    agrupar_errores: con True los mensajes de ERROR se agrupan en plantillas
+    (los IDs, rutas y números se enmascaran) y se cuentan con un TopKAproximado
+    de 'capacidad_errores' entradas, así la memoria no crece con mensajes únicos.
+    Las cuentas pueden sobreestimarse como mucho en el error de cada entrada.
+
+    por_archivo: con True se agrega 'por_archivo' con el resultado de cada archivo.
+
+    Devuelve un ResultadoLog (que también se puede usar como diccionario) con
+    consultas y exportación a JSON/CSV/columnas.
+    """
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+
+    opciones = {
+        'guardar_fechas': guardar_fechas,
+        'agrupar_errores': agrupar_errores,
+        'capacidad_errores': capacidad_errores
+    }
+
+    try:
+        rutas = resolver_rutas(ruta_archivo)
+        tareas = _tareas_de_analisis(rutas, procesos)
+
+        if procesos > 1 and len(tareas) > 1:
+            with ProcessPoolExecutor(max_workers=min(procesos, len(tareas))) as executor:
+                parciales = list(executor.map(
+                    analizar_fragmento,
+                    [ruta for ruta, _, _ in tareas],
+                    [inicio for _, inicio, _ in tareas],
+                    [fin for _, _, fin in tareas],
+                    [opciones] * len(tareas)
+                ))
+        else:
+            parciales = [analizar_fragmento(ruta, inicio, fin, opciones) for ruta, inicio, fin in tareas]
+
+        # Combinar los fragmentos de cada archivo en el orden en que aparecen
+        acumuladores = {}
+        for (ruta, _, _), parcial in zip(tareas, parciales):
+            if ruta in acumuladores:
+                acumuladores[ruta].combinar(parcial)
+            else:
+                acumuladores[ruta] = parcial
+
+        if len(acumuladores) == 1:
+            acumulador = acumuladores[rutas[0]]
+        else:
+            acumulador = AcumuladorLog(**opciones)
+            for parcial in acumuladores.values():
+                acumulador.combinar(parcial)
+            if guardar_fechas:
+                # Cada archivo ya está en orden cronológico: mezcla k-way
+                acumulador.fechas = list(heapq.merge(*(parcial.fechas for parcial in acumuladores.values())))
+
+        resultado = acumulador.resultado(rutas)
+        if por_archivo:
+            resultado.por_archivo = {ruta: parcial.resultado([ruta]) for ruta, parcial in acumuladores.items()}
+
+        # Mostrar informe solo una vez, después de procesar todo
+        mostrar_informe(resultado)
+
+        return resultado
+
+    except FileNotFoundError as e:
+        print(f"Error: El archivo {e.filename or ruta_archivo} no existe.")
+        return None
+
+
+def cargar_checkpoint(ruta_checkpoint):
+    """Carga el checkpoint de un análisis incremental, o None si no existe."""
+    if not os.path.exists(ruta_checkpoint):
+        return None
+    with open(ruta_checkpoint, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_checkpoint(ruta_checkpoint, ruta_archivo, info_archivo, posicion, acumulador):
+    """
+    Guarda el estado del análisis incremental: archivo, inodo, posición en bytes
+    y contadores parciales. Se escribe en un temporal y se renombra para que un
+    corte a mitad de escritura no deje el checkpoint corrupto.
+    """
+    estado = {
+        'archivo': os.path.abspath(ruta_archivo),
+        'dispositivo': info_archivo.st_dev,
+        'inodo': info_archivo.st_ino,
+        'posicion': posicion,
+        'acumulador': acumulador.a_dict()
+    }
+    temporal = ruta_checkpoint + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(estado, f)
+    os.replace(temporal, ruta_checkpoint)
+
+
+def _restaurar_estado(ruta_archivo, ruta_checkpoint, agrupar_errores=False):
+    """
+    Devuelve (acumulador, posicion, info_archivo) para continuar un análisis.
+    Si el archivo fue rotado (otro inodo) o truncado, se sigue acumulando sobre
+    los contadores guardados pero se vuelve a leer el archivo nuevo desde el byte 0.
+    Los logs comprimidos no se aceptan: la posición guardada es un byte del
+    archivo y un flujo comprimido no se puede retomar desde ahí.
+    """
+    if es_comprimido(ruta_archivo):
+        raise ValueError(f"El análisis incremental no admite logs comprimidos ({ruta_archivo}); "
+                         "use analizar_logs()")
+    info = os.stat(ruta_archivo)
+    estado = cargar_checkpoint(ruta_checkpoint)
+
+    if not estado or estado['archivo'] != os.path.abspath(ruta_archivo):
+        return AcumuladorLog(guardar_fechas=False, agrupar_errores=agrupar_errores), 0, info
+
+    acumulador = AcumuladorLog.desde_dict(estado['acumulador'])
+    posicion = estado['posicion']
+    if (info.st_ino, info.st_dev) != (estado['inodo'], estado['dispositivo']) or info.st_size < posicion:
+        posicion = 0
+    return acumulador, posicion, info
+
+
+def analizar_logs_incremental(ruta_archivo, ruta_checkpoint=None, agrupar_errores=False):
+    """
+    Analiza sólo lo que se agregó al log desde la ejecución anterior.
+
+    El estado (posición en bytes, inodo y contadores parciales) se guarda en
+    ruta_checkpoint (por defecto '<ruta_archivo>.checkpoint.json'). Las fechas se
+    resumen siempre con EstadisticasTiempo, como en analizar_logs(guardar_fechas=False).
+    agrupar_errores sólo se tiene en cuenta al crear el checkpoint. Los logs
+    comprimidos (.gz, .bz2, .xz) no se admiten: se analizan con analizar_logs().
+    """
+    if es_comprimido(ruta_archivo):
+        print(f"Error: El análisis incremental no admite logs comprimidos ({ruta_archivo}); use analizar_logs().")
+        return None
+    ruta_checkpoint = ruta_checkpoint or ruta_archivo + '.checkpoint.json'
+
+    try:
+        acumulador, posicion, info = _restaurar_estado(ruta_archivo, ruta_checkpoint, agrupar_errores)
+
+        patron = detectar_formato(ruta_archivo)
+        with open(ruta_archivo, 'rb') as archivo:
+            archivo.seek(posicion)
+            for bloque in leer_bloques_completos(archivo):
+                acumulador.procesar_bytes(bloque, patron=patron)
+            posicion = archivo.tell()
+
+        guardar_checkpoint(ruta_checkpoint, ruta_archivo, info, posicion, acumulador)
+
+        resultado = acumulador.resultado([ruta_archivo])
+        mostrar_informe(resultado)
+        return resultado
 
     except FileNotFoundError:
         print(f"Error: El archivo {ruta_archivo} no existe.")
         return None
 
 
+def seguir_log(ruta_archivo, ruta_checkpoint=None, intervalo=1.0, al_procesar=None, detener=None,
+               agrupar_errores=False, motor_alertas=None):
+    """
+    Sigue el log de forma continua, como 'tail -F', actualizando los contadores.
+
+    Cada 'intervalo' segundos lee las líneas nuevas, llama a
+    al_procesar(acumulador, lineas) si se indicó y guarda el checkpoint.
+    Cuando detecta una rotación (el nombre apunta a otro inodo) termina de leer
+    el archivo anterior y continúa con el nuevo desde el principio; si el
+    archivo fue truncado, vuelve al byte 0.
+
+    Si se pasa un MotorAlertas, cada bloque nuevo se le envía para detectar
+    picos de errores en tiempo real.
+
+    Se detiene con Ctrl+C o cuando se activa el threading.Event 'detener'.
+    Devuelve el acumulador con el estado final.
+    """
+    ruta_checkpoint = ruta_checkpoint or ruta_archivo + '.checkpoint.json'
+    acumulador, posicion, info = _restaurar_estado(ruta_archivo, ruta_checkpoint, agrupar_errores)
+
+    codificacion = locale.getpreferredencoding(False)
+    archivo = open(ruta_archivo, 'rb')
+    archivo.seek(posicion)
+    # El formato se detecta con el primer bloque, por si el archivo empieza vacío
+    patron = None
+
+    def procesar_nuevas():
+        nonlocal patron
+        hubo_datos = False
+        for bloque in leer_bloques_completos(archivo):
+            if patron is None:
+                patron = detectar_formato_bytes(bloque)
+            acumulador.procesar_bytes(bloque, codificacion=codificacion, patron=patron)
+            if motor_alertas:
+                motor_alertas.procesar_bloque(bloque, patron, codificacion)
+            if al_procesar:
+                al_procesar(acumulador, bloque.decode(codificacion).splitlines())
+            hubo_datos = True
+        if hubo_datos:
+            guardar_checkpoint(ruta_checkpoint, ruta_archivo, info, archivo.tell(), acumulador)
+
+    try:
+        while detener is None or not detener.is_set():
+            procesar_nuevas()
+
+            try:
+                info_actual = os.stat(ruta_archivo)
+            except FileNotFoundError:
+                # Entre el renombrado y la creación del archivo nuevo
+                info_actual = None
+
+            if info_actual is not None:
+                if (info_actual.st_ino, info_actual.st_dev) != (info.st_ino, info.st_dev):
+                    # Rotación: terminar de leer el archivo anterior y pasar al nuevo
+                    procesar_nuevas()
+                    archivo.close()
+                    archivo = open(ruta_archivo, 'rb')
+                    info = os.fstat(archivo.fileno())
+                    patron = None
+                    guardar_checkpoint(ruta_checkpoint, ruta_archivo, info, 0, acumulador)
+                    continue
+                if info_actual.st_size < archivo.tell():
+                    # Truncado (por ejemplo, rotación con copytruncate)
+                    archivo.seek(0)
+                    continue
+
+            time.sleep(intervalo)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        guardar_checkpoint(ruta_checkpoint, ruta_archivo, info, archivo.tell(), acumulador)
+        archivo.close()
+
+    return acumulador
+
+
+# Ventanas del motor de alertas: nombre -> duración en segundos
+VENTANAS_ALERTA = {
+    '1m': 60,
+    '5m': 300,
+    '1h': 3600,
+}
+
+EPOCA = datetime(1970, 1, 1)
+
+
+class VentanaDeslizante:
+    """
+    Cuenta eventos por nivel en una ventana deslizante de 'duracion' segundos.
+
+    La ventana se divide en 'ranuras' intervalos guardados en buffers circulares
+    de tamaño fijo; al avanzar el tiempo se vacían las ranuras que salen de la
+    ventana. La memoria no depende de cuántos eventos se procesen.
+    """
+
+    def __init__(self, duracion, ranuras=60):
+        self.duracion = duracion
+        self.ranuras = ranuras
+        self.ancho = duracion / ranuras
+        self.ids = [None] * ranuras
+        self.cuentas = {}
+        self.totales = Counter()
+        self.actual = None
+
+    def _abrir(self, ranura):
+        posicion = ranura % self.ranuras
+        for nivel, cuentas in self.cuentas.items():
+            if cuentas[posicion]:
+                self.totales[nivel] -= cuentas[posicion]
+                cuentas[posicion] = 0
+        self.ids[posicion] = ranura
+
+    def avanzar(self, ranura):
+        """Mueve la ventana hasta la ranura indicada, vaciando las que quedan afuera."""
+        if self.actual is not None and ranura <= self.actual:
+            return
+        desde = ranura - self.ranuras + 1
+        if self.actual is not None:
+            desde = max(desde, self.actual + 1)
+        for siguiente in range(desde, ranura + 1):
+            self._abrir(siguiente)
+        self.actual = ranura
+
+    def agregar(self, segundos, nivel, cantidad=1):
+        """Suma eventos del nivel en el instante indicado (segundos desde la época)."""
+        ranura = int(segundos // self.ancho)
+        self.avanzar(ranura)
+        posicion = ranura % self.ranuras
+        if self.ids[posicion] != ranura:
+            # Evento más viejo que la ventana
+            return
+        cuentas = self.cuentas.get(nivel)
+        if cuentas is None:
+            cuentas = self.cuentas[nivel] = [0] * self.ranuras
+        cuentas[posicion] += cantidad
+        self.totales[nivel] += cantidad
+
+
+class MotorAlertas:
+    """
+    Detecta picos de errores en tiempo real sobre ventanas deslizantes (1m, 5m y 1h).
+
+    Cada vez que una ventana avanza de ranura se calcula su tasa de errores
+    (eventos de niveles_error por segundo) y se compara con una línea base EWMA
+    de esa misma ventana. Si la tasa supera factor * línea base y hay al menos
+    minimo_errores, se emite una alerta (una sola vez hasta que la ventana
+    vuelve a la normalidad). Mientras dura una alerta la línea base no se
+    actualiza, para que un pico largo no pase a ser lo normal.
+
+    'alfa' es el peso de una ventana completa en la línea base; como se evalúa
+    una vez por ranura, se convierte al peso equivalente por ranura.
+
+    Usa memoria constante: buffers circulares por ventana y las últimas alertas.
+    """
+
+    def __init__(self, ventanas=None, ranuras=60, alfa=0.1, factor=3.0, minimo_errores=20,
+                 niveles_error=('ERROR', 'CRITICAL'), al_alertar=None, max_alertas=100):
+        ventanas = ventanas or VENTANAS_ALERTA
+        self.ventanas = {nombre: VentanaDeslizante(duracion, ranuras) for nombre, duracion in ventanas.items()}
+        self.alfa = alfa
+        self.factor = factor
+        self.minimo_errores = minimo_errores
+        self.niveles_error = niveles_error
+        self.al_alertar = al_alertar
+        self.alfas = {nombre: 1 - (1 - alfa) ** (1 / ventana.ranuras)
+                      for nombre, ventana in self.ventanas.items()}
+        self.lineas_base = {nombre: None for nombre in self.ventanas}
+        self.evaluaciones = {nombre: 0 for nombre in self.ventanas}
+        self.en_alerta = {nombre: False for nombre in self.ventanas}
+        self.alertas = deque(maxlen=max_alertas)
+        self._codificacion = locale.getpreferredencoding(False)
+
+    def procesar(self, fecha, nivel, cantidad=1):
+        """Registra 'cantidad' eventos del nivel en la fecha indicada."""
+        segundos = (fecha - EPOCA).total_seconds()
+        for nombre, ventana in self.ventanas.items():
+            ranura = int(segundos // ventana.ancho)
+            if ventana.actual is not None and ranura > ventana.actual:
+                # Se cerró al menos una ranura: evaluar la ventana antes de sumar el evento nuevo
+                ventana.avanzar(ranura)
+                self._evaluar(nombre, ventana, fecha)
+            ventana.agregar(segundos, nivel, cantidad)
+
+    def procesar_bloque(self, bloque, patron=PATRON_LINEA_BYTES, codificacion=None):
+        """Procesa un bloque de líneas en bytes (como los que lee seguir_log)."""
+        codificacion = codificacion or self._codificacion
+        ultima_fecha = None
+        fecha = None
+        for fecha_bytes, nivel, _ in separar_campos(bloque, patron):
+            if fecha_bytes != ultima_fecha:
+                ultima_fecha = fecha_bytes
+                fecha = parsear_fecha(fecha_bytes.decode(codificacion))
+            if fecha is not None:
+                self.procesar(fecha, nivel.decode(codificacion))
+
+    def procesar_eventos(self, eventos):
+        """Procesa tuplas (fecha, ruta, nivel, mensaje), por ejemplo de eventos_ordenados()."""
+        for fecha, _, nivel, _ in eventos:
+            self.procesar(fecha, nivel)
+
+    def _evaluar(self, nombre, ventana, fecha):
+        errores = sum(ventana.totales[nivel] for nivel in self.niveles_error)
+        total = sum(ventana.totales.values())
+        tasa = errores / ventana.duracion
+        linea_base = self.lineas_base[nombre]
+        self.evaluaciones[nombre] += 1
+        if self.evaluaciones[nombre] <= ventana.ranuras:
+            # La ventana todavía se está llenando: la línea base arranca con la primera ventana completa
+            self.lineas_base[nombre] = tasa
+            return
+
+        anomalia = (
+            errores >= self.minimo_errores
+            and tasa > linea_base * self.factor
+        )
+
+        if anomalia and not self.en_alerta[nombre]:
+            alerta = {
+                'ventana': nombre,
+                'fecha': fecha,
+                'errores': errores,
+                'total': total,
+                'proporcion_errores': errores / total if total else 0.0,
+                'tasa': tasa,
+                'linea_base': linea_base
+            }
+            self.alertas.append(alerta)
+            if self.al_alertar:
+                self.al_alertar(alerta)
+            else:
+                print(f"ALERTA [{nombre}] {fecha}: {errores} errores "
+                      f"({tasa * 60:.2f}/min, línea base {linea_base * 60:.2f}/min)")
+        self.en_alerta[nombre] = anomalia
+
+        if not anomalia:
+            alfa = self.alfas[nombre]
+            self.lineas_base[nombre] = alfa * tasa + (1 - alfa) * linea_base
+
 
 # Esta sección es crucial para ejecutar el script directamente
 if __name__ == "__main__":
     resultado = analizar_logs("app_server.log")
+    # Para logs grandes se puede usar un proceso por núcleo:
+    # resultado = analizar_logs("app_server.log", procesos=None)
+    # Y para no guardar cada fecha en memoria:
+    # resultado = analizar_logs("app_server.log", guardar_fechas=False)
+    # resultado['tiempo'].serie_tasa('hora')
+    # Para agrupar los errores por plantilla con memoria fija:
+    # resultado = analizar_logs("app_server.log", agrupar_errores=True)
+    # Para combinar varios archivos en un solo informe:
+    # resultado = analizar_logs("logs/automatizador_*.log", por_archivo=True)
+    # Para procesar sólo lo nuevo desde la última ejecución:
+    # resultado = analizar_logs_incremental("app_server.log")
+    # Para seguir el log en vivo con alertas de picos de errores:
+    # seguir_log("app_server.log", motor_alertas=MotorAlertas())
     # Si quieres usar los resultados para análisis adicional:
     if resultado:
         # Por ejemplo, puedes acceder a los contadores
         print("\nAcceso programático a los resultados:")
-        print(f"Total de errores: {sum(resultado['errores'].values())}")
\ No newline at end of file
+        print(f"Total de errores: {sum(resultado['errores'].values())}")
+        # O exportar los agregados para un dashboard:
+        # resultado.a_json("reportes/analisis_log.json")
+        # resultado.a_csv("reportes/analisis_log.csv")
@@ -10,35 +10,491 @@ Manejar errores adecuadamente y devolver códigos de estado HTTP apropiados
 
 from flask import Flask, request, jsonify, abort
 from datetime import datetime
+from collections import defaultdict
+import os
+import json
 import uuid
+import base64
+import bisect
+import itertools
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
 
 app = Flask(__name__)
 
-# Almacenamiento en memoria para las tareas
-tareas = {}
+# Conexiones abiertas como máximo por cada AlmacenSQLite (por proceso)
+TAMANO_POOL_SQLITE = 8
+
+# Campos que se pueden cambiar con PUT
+CAMPOS_EDITABLES = ('titulo', 'descripcion', 'fecha_limite', 'estado')
+
+# Campos de una tarea, los que se pueden pedir con fields=
+CAMPOS_TAREA = ('id', 'titulo', 'descripcion', 'fecha_creacion', 'fecha_limite', 'estado')
+
+# Tareas por página en GET /api/tareas con limit/after
+LIMITE_PAGINA_PREDETERMINADO = 100
+LIMITE_PAGINA_MAXIMO = 1000
+
+
+def normalizar_estado(estado):
+    """Estado tal como se compara al filtrar (sin distinguir mayúsculas); None si no es texto."""
+    return estado.lower() if isinstance(estado, str) else None
+
+
+class AlmacenMemoria:
+    """
+    Tareas en un diccionario en memoria: se pierden al reiniciar y no se
+    comparten entre procesos.
+
+    Para filtrar por estado sin recorrer todas las tareas se mantiene un
+    índice secundario: estado normalizado -> números de creación de sus
+    tareas, ordenados. Listar un estado cuesta lo que mide el resultado.
+    Todos los números de creación están además en 'creadas', donde las
+    tareas eliminadas se descartan recién al compactar la lista.
+
+    Un candado protege las modificaciones y las lecturas de los índices, así
+    se puede usar desde los hilos del servidor. listar() lo toma de a tandas
+    de LOTE_LISTADO tareas y lo suelta mientras se consume cada tanda, para
+    no frenar a las escrituras durante una respuesta larga.
+    """
+
+    LOTE_LISTADO = 256
+
+    def __init__(self):
+        self.tareas = {}
+        self.creaciones = 0
+        # id -> número de creación, y al revés
+        self.numeros = {}
+        self.ids = {}
+        self.por_estado = defaultdict(list)
+        self.creadas = []
+        self.eliminadas = 0
+        self._candado = threading.Lock()
+
+    def _indexar(self, tarea):
+        bisect.insort(self.por_estado[normalizar_estado(tarea['estado'])], self.numeros[tarea['id']])
+
+    def _desindexar(self, tarea):
+        estado = normalizar_estado(tarea['estado'])
+        numeros = self.por_estado[estado]
+        del numeros[bisect.bisect_left(numeros, self.numeros[tarea['id']])]
+        if not numeros:
+            del self.por_estado[estado]
+
+    def listar(self, estado=None, despues=None, limite=None):
+        """
+        Genera (número de creación, tarea) en orden de creación: sólo las del
+        estado indicado si se pasa uno, sólo las creadas después del número
+        'despues' y como mucho 'limite'.
+        """
+        clave = normalizar_estado(estado) if estado else None
+        ultimo = -1 if despues is None else despues
+        pendientes = limite
+        while pendientes is None or pendientes > 0:
+            lote = self.LOTE_LISTADO if pendientes is None else min(pendientes, self.LOTE_LISTADO)
+            tanda = []
+            with self._candado:
+                # Las listas pueden haberse reemplazado o cambiado desde la
+                # tanda anterior: se vuelve a buscar la posición de 'ultimo'
+                numeros = self.por_estado.get(clave, []) if clave else self.creadas
+                indice = bisect.bisect_right(numeros, ultimo)
+                while indice < len(numeros) and len(tanda) < lote:
+                    numero = numeros[indice]
+                    indice += 1
+                    tarea = self.tareas.get(self.ids.get(numero))
+                    if tarea is not None:
+                        # Las eliminadas siguen en 'creadas' hasta que se compacte
+                        tanda.append((numero, tarea))
+                    ultimo = numero
+                terminado = indice >= len(numeros)
+            yield from tanda
+            if pendientes is not None:
+                pendientes -= len(tanda)
+            if terminado:
+                return
+
+    def obtener(self, id_tarea):
+        """Devuelve la tarea o None si no existe."""
+        return self.tareas.get(id_tarea)
+
+    def crear(self, tarea):
+        with self._candado:
+            self.tareas[tarea['id']] = tarea
+            self.numeros[tarea['id']] = self.creaciones
+            self.ids[self.creaciones] = tarea['id']
+            self.creadas.append(self.creaciones)
+            self.creaciones += 1
+            self._indexar(tarea)
+        return tarea
+
+    def actualizar(self, id_tarea, cambios):
+        """Aplica los cambios a la tarea y la devuelve, o None si no existe."""
+        with self._candado:
+            tarea = self.tareas.get(id_tarea)
+            if tarea is None:
+                return None
+            if 'estado' in cambios:
+                self._desindexar(tarea)
+            # Se reemplaza el diccionario en lugar de modificarlo, por si otro
+            # hilo lo está convirtiendo a JSON en este momento
+            tarea = dict(tarea, **cambios)
+            self.tareas[id_tarea] = tarea
+            if 'estado' in cambios:
+                self._indexar(tarea)
+        return tarea
+
+    def eliminar(self, id_tarea):
+        """Elimina la tarea y la devuelve, o None si no existía."""
+        with self._candado:
+            tarea = self.tareas.pop(id_tarea, None)
+            if tarea is not None:
+                self._desindexar(tarea)
+                del self.ids[self.numeros.pop(id_tarea)]
+                self.eliminadas += 1
+                if self.eliminadas > len(self.creadas) // 2:
+                    self.creadas = [numero for numero in self.creadas if numero in self.ids]
+                    self.eliminadas = 0
+        return tarea
+
+
+class Transaccion:
+    """
+    Transacción de escritura (BEGIN IMMEDIATE): toma el candado de escritura
+    al empezar, así leer y modificar una tarea es atómico aunque escriban
+    varios procesos. Confirma al salir del bloque o deshace si hubo un error.
+    """
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def __enter__(self):
+        self.conexion.execute("BEGIN IMMEDIATE")
+        return self.conexion
+
+    def __exit__(self, tipo, valor, traza):
+        self.conexion.execute("COMMIT" if tipo is None else "ROLLBACK")
+        return False
+
+
+class PoolAgotado(sqlite3.OperationalError):
+    """No se liberó ninguna conexión del pool de AlmacenSQLite a tiempo."""
+
+
+class AlmacenSQLite:
+    """
+    Tareas en una base SQLite, persistentes y compartidas entre procesos (por
+    ejemplo, los workers de gunicorn).
+
+    - Modo WAL: las lecturas no esperan a las escrituras de otros procesos.
+    - Un pool de hasta 'tamano_pool' conexiones: cada operación toma una y la
+      devuelve al terminar (listar, después de leer cada tanda de
+      LOTE_LISTADO tareas), así la cantidad de conexiones no depende de
+      cuántos hilos use el servidor ni de cuánto tarde un cliente en leer una
+      respuesta. Si están todas en uso se espera hasta 'espera' segundos y
+      después se lanza PoolAgotado. Después de un fork, el proceso hijo arma
+      su propio pool.
+    - Las consultas son constantes con parámetros, así cada conexión las
+      compila una sola vez y las reutiliza de su caché de sentencias.
+    - Cada tarea se guarda completa en JSON (devuelve exactamente lo que se
+      guardó, con cualquier tipo de valor); el estado normalizado y la fecha
+      límite se guardan además en columnas con índice para filtrar.
+    - 'orden' es AUTOINCREMENT: nunca se reutiliza el número de una tarea
+      eliminada, así una tarea nueva siempre queda después de cualquier
+      cursor de paginación ya entregado.
+    """
+
+    LOTE_LISTADO = 256
+
+    ESQUEMA = (
+        """CREATE TABLE IF NOT EXISTS tareas (
+            orden INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            estado TEXT,
+            fecha_limite TEXT,
+            datos TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS tareas_estado ON tareas (estado, orden)",
+        "CREATE INDEX IF NOT EXISTS tareas_fecha_limite ON tareas (fecha_limite)",
+    )
+    # LIMIT -1 es sin límite
+    SQL_LISTAR = "SELECT orden, datos FROM tareas WHERE orden > ? ORDER BY orden LIMIT ?"
+    SQL_LISTAR_ESTADO = "SELECT orden, datos FROM tareas WHERE estado = ? AND orden > ? ORDER BY orden LIMIT ?"
+    SQL_OBTENER = "SELECT datos FROM tareas WHERE id = ?"
+    SQL_INSERTAR = "INSERT INTO tareas (id, estado, fecha_limite, datos) VALUES (?, ?, ?, ?)"
+    SQL_ACTUALIZAR = "UPDATE tareas SET estado = ?, fecha_limite = ?, datos = ? WHERE id = ?"
+    SQL_ELIMINAR = "DELETE FROM tareas WHERE id = ?"
+
+    def __init__(self, ruta, tamano_pool=TAMANO_POOL_SQLITE, espera=5.0):
+        self.ruta = ruta
+        self.tamano_pool = tamano_pool
+        self.espera = espera
+        self._candado = threading.Lock()
+        self._libres = queue.LifoQueue()
+        self._abiertas = 0
+        self._pid = os.getpid()
+        with self._prestar() as conexion, Transaccion(conexion):
+            for sentencia in self.ESQUEMA:
+                conexion.execute(sentencia)
+
+    def _abrir(self):
+        conexion = sqlite3.connect(self.ruta, timeout=self.espera, isolation_level=None,
+                                   check_same_thread=False, cached_statements=64)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        return conexion
+
+    def _tomar(self):
+        """Saca una conexión del pool, abriendo una nueva si todavía no se llegó al máximo."""
+        with self._candado:
+            if self._pid != os.getpid():
+                # Las conexiones heredadas de otro proceso no se pueden usar ni cerrar
+                self._libres = queue.LifoQueue()
+                self._abiertas = 0
+                self._pid = os.getpid()
+            try:
+                return self._libres.get_nowait()
+            except queue.Empty:
+                pass
+            abrir = self._abiertas < self.tamano_pool
+            if abrir:
+                self._abiertas += 1
+        if abrir:
+            try:
+                return self._abrir()
+            except sqlite3.Error:
+                with self._candado:
+                    self._abiertas -= 1
+                raise
+        try:
+            return self._libres.get(timeout=self.espera)
+        except queue.Empty:
+            raise PoolAgotado("No hay conexiones libres en el pool de SQLite") from None
+
+    def _devolver(self, conexion):
+        if conexion.in_transaction:
+            conexion.rollback()
+        with self._candado:
+            if self._pid == os.getpid():
+                self._libres.put(conexion)
+
+    @contextmanager
+    def _prestar(self):
+        """Presta una conexión del pool durante el bloque with."""
+        conexion = self._tomar()
+        try:
+            yield conexion
+        finally:
+            self._devolver(conexion)
+
+    def cerrar(self):
+        """Cierra las conexiones libres del pool (las que están en uso se cierran al devolverse)."""
+        with self._candado:
+            while True:
+                try:
+                    self._libres.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._abiertas -= 1
+
+    @staticmethod
+    def _columnas(tarea):
+        fecha_limite = tarea.get('fecha_limite')
+        return (normalizar_estado(tarea.get('estado')),
+                fecha_limite if isinstance(fecha_limite, str) else None,
+                json.dumps(tarea, ensure_ascii=False))
+
+    def listar(self, estado=None, despues=None, limite=None):
+        """
+        Genera (número de creación, tarea) en orden de creación: sólo las del
+        estado indicado si se pasa uno, sólo las creadas después del número
+        'despues' y como mucho 'limite'. Las filas se leen de a tandas de
+        LOTE_LISTADO, cada una con una consulta que sigue después de la última
+        leída (los índices (estado, orden) y la clave primaria orden permiten
+        empezar directamente ahí); la conexión vuelve al pool entre tandas.
+        """
+        filtro = (normalizar_estado(estado),) if estado else ()
+        sql = self.SQL_LISTAR_ESTADO if estado else self.SQL_LISTAR
+        ultimo = -1 if despues is None else despues
+        pendientes = limite
+        while pendientes is None or pendientes > 0:
+            lote = self.LOTE_LISTADO if pendientes is None else min(pendientes, self.LOTE_LISTADO)
+            with self._prestar() as conexion:
+                filas = conexion.execute(sql, filtro + (ultimo, lote)).fetchall()
+            for orden, datos in filas:
+                yield orden, json.loads(datos)
+            if len(filas) < lote:
+                return
+            ultimo = filas[-1][0]
+            if pendientes is not None:
+                pendientes -= len(filas)
+
+    def obtener(self, id_tarea):
+        """Devuelve la tarea o None si no existe."""
+        with self._prestar() as conexion:
+            fila = conexion.execute(self.SQL_OBTENER, (id_tarea,)).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def crear(self, tarea):
+        with self._prestar() as conexion, Transaccion(conexion):
+            conexion.execute(self.SQL_INSERTAR, (tarea['id'],) + self._columnas(tarea))
+        return tarea
+
+    def actualizar(self, id_tarea, cambios):
+        """Aplica los cambios a la tarea y la devuelve, o None si no existe."""
+        with self._prestar() as conexion, Transaccion(conexion):
+            fila = conexion.execute(self.SQL_OBTENER, (id_tarea,)).fetchone()
+            if fila is None:
+                return None
+            tarea = json.loads(fila[0])
+            tarea.update(cambios)
+            conexion.execute(self.SQL_ACTUALIZAR, self._columnas(tarea) + (id_tarea,))
+        return tarea
+
+    def eliminar(self, id_tarea):
+        """Elimina la tarea y la devuelve, o None si no existía."""
+        with self._prestar() as conexion, Transaccion(conexion):
+            fila = conexion.execute(self.SQL_OBTENER, (id_tarea,)).fetchone()
+            if fila is None:
+                return None
+            conexion.execute(self.SQL_ELIMINAR, (id_tarea,))
+        return json.loads(fila[0])
+
+
+def crear_almacen(destino=None):
+    """
+    Crea el almacén de tareas: 'memoria' para guardarlas en memoria o la ruta
+    de una base SQLite. Por defecto usa la variable de entorno TAREAS_DB, o
+    'tareas.db' si no está definida.
+    """
+    destino = destino or os.environ.get('TAREAS_DB', 'tareas.db')
+    if destino == 'memoria':
+        return AlmacenMemoria()
+    return AlmacenSQLite(destino)
+
+
+# Almacenamiento de las tareas: se crea al usarlo por primera vez (ver
+# obtener_almacen), así importar el módulo no crea la base
+almacen = None
+candado_almacen = threading.Lock()
+
+
+def obtener_almacen():
+    """Devuelve el almacén de tareas, creándolo con crear_almacen() la primera vez."""
+    global almacen
+    if almacen is None:
+        with candado_almacen:
+            if almacen is None:
+                almacen = crear_almacen()
+    return almacen
+
+
+def codificar_cursor(numero):
+    """Cursor opaco para 'after' a partir del número de creación de la última tarea de una página."""
+    return base64.urlsafe_b64encode(str(numero).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except ValueError:
+        abort(400, description="El parámetro after no es un cursor válido")
+
+
+def leer_campos(texto):
+    """Campos pedidos con 'fields=id,titulo', o None para devolver las tareas completas."""
+    if not texto:
+        return None
+    campos = [campo.strip() for campo in texto.split(',') if campo.strip()]
+    desconocidos = [campo for campo in campos if campo not in CAMPOS_TAREA]
+    if desconocidos:
+        abort(400, description=f"Campos desconocidos: {', '.join(desconocidos)}")
+    return campos
+
+
+def leer_limite(texto):
+    try:
+        limite = int(texto) if texto is not None else LIMITE_PAGINA_PREDETERMINADO
+    except ValueError:
+        limite = 0
+    if not 1 <= limite <= LIMITE_PAGINA_MAXIMO:
+        abort(400, description=f"El parámetro limit debe ser un entero entre 1 y {LIMITE_PAGINA_MAXIMO}")
+    return limite
+
+
+def proyectar(tarea, campos):
+    """La tarea con sólo los campos pedidos (todos si campos es None)."""
+    if campos is None:
+        return tarea
+    return {campo: tarea[campo] for campo in campos if campo in tarea}
+
+
+def respuesta_lista(tareas):
+    """
+    Respuesta con la lista JSON de las tareas, serializadas de a una mientras
+    se envía: la lista completa nunca se arma en memoria. Sale con el mismo
+    formato que jsonify (indentada en modo debug, compacta si no).
+
+    La primera tarea se pide antes de empezar la respuesta: si el almacén
+    falla al leerla, el error sale con su código en lugar de un 200 cortado.
+    """
+    indentar = app.json.compact is False or (app.json.compact is None and app.debug)
+    tareas = iter(tareas)
+    primera = next(tareas, None)
+
+    def partes():
+        separador = '['
+        for tarea in ([] if primera is None else itertools.chain([primera], tareas)):
+            if indentar:
+                yield separador + '\n  ' + app.json.dumps(tarea, indent=2).replace('\n', '\n  ')
+            else:
+                yield separador + app.json.dumps(tarea, separators=(',', ':'))
+            separador = ','
+        if separador == '[':
+            yield '[]\n'
+        else:
+            yield '\n]\n' if indentar else ']\n'
+
+    return app.response_class(partes(), mimetype=app.json.mimetype)
 
 
 @app.route('/api/tareas', methods=['GET'])
 def obtener_tareas():
-    """Devuelve todas las tareas o las filtra por estado."""
+    """
+    Devuelve todas las tareas o las filtra por estado.
+
+    Con 'limit' o 'after' devuelve una página en orden de creación,
+    {"tareas": [...], "siguiente": cursor}: 'siguiente' se pasa como 'after'
+    para pedir la página que sigue y es null en la última. Con 'fields'
+    (por ejemplo fields=id,titulo) cada tarea trae sólo esos campos.
+    """
     # Filtrar por estado si se proporciona como parámetro de consulta
     estado = request.args.get('estado')
+    campos = leer_campos(request.args.get('fields'))
 
-    if estado:
-        tareas_filtradas = {id_tarea: tarea for id_tarea, tarea in tareas.items()
-                            if tarea['estado'].lower() == estado.lower()}
-        return jsonify(list(tareas_filtradas.values()))
+    if 'limit' not in request.args and 'after' not in request.args:
+        return respuesta_lista(proyectar(tarea, campos) for _, tarea in obtener_almacen().listar(estado))
 
-    return jsonify(list(tareas.values()))
+    limite = leer_limite(request.args.get('limit'))
+    despues = decodificar_cursor(request.args['after']) if 'after' in request.args else None
+    # Una tarea de más para saber si hay otra página
+    pagina = list(obtener_almacen().listar(estado, despues, limite + 1))
+    siguiente = codificar_cursor(pagina[limite - 1][0]) if len(pagina) > limite else None
+    return jsonify({
+        'tareas': [proyectar(tarea, campos) for _, tarea in pagina[:limite]],
+        'siguiente': siguiente
+    })
 
 
 @app.route('/api/tareas/<string:id_tarea>', methods=['GET'])
 def obtener_tarea(id_tarea):
     """Devuelve una tarea específica por su ID."""
-    if id_tarea not in tareas:
+    tarea = obtener_almacen().obtener(id_tarea)
+    if tarea is None:
         abort(404, description=f"Tarea con ID {id_tarea} no encontrada")
 
-    return jsonify(tareas[id_tarea])
+    return jsonify(tarea)
 
 
 @app.route('/api/tareas', methods=['POST'])
@@ -68,7 +524,7 @@ def crear_tarea():
     }
 
     # Guardar la tarea
-    tareas[id_tarea] = tarea
+    obtener_almacen().crear(tarea)
 
     return jsonify(tarea), 201
 
@@ -76,26 +532,18 @@ def crear_tarea():
 @app.route('/api/tareas/<string:id_tarea>', methods=['PUT'])
 def actualizar_tarea(id_tarea):
     """Actualiza una tarea existente."""
-    if id_tarea not in tareas:
+    if obtener_almacen().obtener(id_tarea) is None:
         abort(404, description=f"Tarea con ID {id_tarea} no encontrada")
 
     if not request.json:
         abort(400, description="Los datos de actualización deben estar en formato JSON")
 
-    tarea = tareas[id_tarea]
-
     # Actualizar campos si se proporcionan
-    if 'titulo' in request.json:
-        tarea['titulo'] = request.json['titulo']
-
-    if 'descripcion' in request.json:
-        tarea['descripcion'] = request.json['descripcion']
-
-    if 'fecha_limite' in request.json:
-        tarea['fecha_limite'] = request.json['fecha_limite']
-
-    if 'estado' in request.json:
-        tarea['estado'] = request.json['estado']
+    cambios = {campo: request.json[campo] for campo in CAMPOS_EDITABLES if campo in request.json}
+    tarea = obtener_almacen().actualizar(id_tarea, cambios)
+    if tarea is None:
+        # Se eliminó mientras tanto
+        abort(404, description=f"Tarea con ID {id_tarea} no encontrada")
 
     return jsonify(tarea)
 
@@ -103,11 +551,10 @@ def actualizar_tarea(id_tarea):
 @app.route('/api/tareas/<string:id_tarea>', methods=['DELETE'])
 def eliminar_tarea(id_tarea):
     """Elimina una tarea."""
-    if id_tarea not in tareas:
+    tarea_eliminada = obtener_almacen().eliminar(id_tarea)
+    if tarea_eliminada is None:
         abort(404, description=f"Tarea con ID {id_tarea} no encontrada")
 
-    tarea_eliminada = tareas.pop(id_tarea)
-
     return jsonify({'mensaje': f"Tarea '{tarea_eliminada['titulo']}' eliminada correctamente"})
 
 
@@ -123,6 +570,12 @@ def bad_request(e):
     return jsonify(error=str(e)), 400
 
 
+@app.errorhandler(PoolAgotado)
+def service_unavailable(e):
+    """Manejador para cuando no hay conexiones libres a la base de datos."""
+    return jsonify(error=str(e)), 503
+
+
 # Opcional: Crear algunas tareas de ejemplo al iniciar
 def crear_tareas_ejemplo():
     """Crea algunas tareas de ejemplo."""
@@ -147,14 +600,20 @@ def crear_tareas_ejemplo():
         }
     ]
 
+    # Con una base persistente, los ejemplos se crean sólo la primera vez
+    if next(obtener_almacen().listar(limite=1), None) is not None:
+        return
+
     for ejemplo in ejemplos:
         id_tarea = str(uuid.uuid4())
         ejemplo['id'] = id_tarea
         ejemplo['fecha_creacion'] = datetime.now().isoformat()
-        tareas[id_tarea] = ejemplo
+        obtener_almacen().crear(ejemplo)
 
 
 if __name__ == '__main__':
+    # Las tareas se guardan en tareas.db; para otra base o para tenerlas sólo
+    # en memoria: TAREAS_DB=otra.db python api_rest_flask.py / TAREAS_DB=memoria ...
     crear_tareas_ejemplo()
     app.run(debug=True)
 
@@ -169,4 +628,8 @@ if __name__ == '__main__':
     
     curl http://127.0.0.1:5000/api/tareas
 
+    curl "http://127.0.0.1:5000/api/tareas?estado=pendiente&limit=50&fields=id,titulo"
+
+    curl "http://127.0.0.1:5000/api/tareas?limit=50&after=<siguiente de la página anterior>"
+
     """
\ No newline at end of file
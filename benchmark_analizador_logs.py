@@ -0,0 +1,219 @@
+"""
+Benchmarks del analizador de logs.
+
+- fechas: compara cuántas fechas por segundo se convierten con datetime.strptime
+  (camino anterior) y con parsear_fecha (camino rápido), en el formato de
+  app_server.log y en el formato asctime de logging.
+- parser: genera logs sintéticos (por defecto de 1M y 10M líneas) y compara
+  distintas formas de separar cada línea en fecha, nivel y mensaje, además del
+  análisis completo original y con analizar_fragmento.
+
+Uso:
+    python benchmark_analizador_logs.py fechas --lineas 500000
+    python benchmark_analizador_logs.py parser --lineas 1000000 10000000
+"""
+
+import os
+import re
+import mmap
+import time
+import random
+import argparse
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+
+from analizador_logs import (parsear_fecha, analizar_fragmento, separar_lineas, bloques_mapeados,
+                             FORMATO_FECHA, FORMATO_ASCTIME, PATRON_LINEA, PATRON_LINEA_BYTES)
+
+
+NIVELES = ['INFO'] * 70 + ['DEBUG'] * 15 + ['WARNING'] * 10 + ['ERROR'] * 5
+
+MENSAJES = [
+    'User login: {usuario}',
+    'Request {id} served in {ms} ms',
+    'Database query timeout after {ms} ms',
+    'File not found: /var/data/{id}/config.json',
+    'High memory usage detected ({porcentaje}%)',
+    'Scheduled backup started',
+]
+
+
+def generar_fechas(cantidad, asctime=False, semilla=42):
+    """Genera fechas ordenadas, con varios eventos por segundo, como un log real."""
+    aleatorio = random.Random(semilla)
+    fecha = datetime(2023, 4, 15, 8, 0, 0)
+    fechas = []
+    for _ in range(cantidad):
+        fecha += timedelta(milliseconds=aleatorio.randint(0, 500))
+        if asctime:
+            fechas.append(fecha.strftime(FORMATO_FECHA) + f",{fecha.microsecond // 1000:03d}")
+        else:
+            fechas.append(fecha.strftime(FORMATO_FECHA))
+    return fechas
+
+
+def generar_log(ruta_archivo, cantidad, semilla=42):
+    """Escribe un log sintético con formato [FECHA] [NIVEL] MENSAJE."""
+    aleatorio = random.Random(semilla)
+    fecha = datetime(2023, 4, 15, 8, 0, 0)
+    segundo_actual = None
+    with open(ruta_archivo, 'w', encoding='utf-8') as archivo:
+        for _ in range(cantidad):
+            fecha += timedelta(milliseconds=aleatorio.randint(0, 200))
+            if segundo_actual != fecha.second:
+                # strftime sólo cuando cambia el segundo, para generar rápido
+                segundo_actual = fecha.second
+                fecha_str = fecha.strftime(FORMATO_FECHA)
+            mensaje = aleatorio.choice(MENSAJES).format(
+                usuario=f'user{aleatorio.randint(1, 500)}',
+                id=aleatorio.randint(1, 10 ** 6),
+                ms=aleatorio.randint(1, 5000),
+                porcentaje=aleatorio.randint(70, 99)
+            )
+            archivo.write(f'[{fecha_str}] [{aleatorio.choice(NIVELES)}] {mensaje}\n')
+
+
+def medir(funcion, *args):
+    """Ejecuta la función y devuelve (resultado, segundos)."""
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+# --- Variantes de parser para la comparación ---
+
+def parser_original(ruta_archivo):
+    """Como el analizador original: modo texto, strip() y re.match con el patrón en texto."""
+    cantidad = 0
+    with open(ruta_archivo, 'r') as archivo:
+        for linea in archivo:
+            match = re.match(PATRON_LINEA, linea.strip())
+            if match:
+                match.groups()
+                cantidad += 1
+    return cantidad
+
+
+def parser_compilado(ruta_archivo):
+    """Patrón precompilado, pero todavía línea por línea y con strip()."""
+    patron = re.compile(PATRON_LINEA)
+    cantidad = 0
+    with open(ruta_archivo, 'r') as archivo:
+        for linea in archivo:
+            match = patron.match(linea.strip())
+            if match:
+                match.groups()
+                cantidad += 1
+    return cantidad
+
+
+def parser_split(ruta_archivo):
+    """separar_lineas() (split y partition sobre bytes) en bloques del archivo mapeado: lo que usa el analizador."""
+    cantidad = 0
+    with open(ruta_archivo, 'rb') as archivo:
+        with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            for bloque in bloques_mapeados(mapa):
+                for _ in separar_lineas(bloque):
+                    cantidad += 1
+    return cantidad
+
+
+def parser_finditer(ruta_archivo):
+    """PATRON_LINEA_BYTES con finditer sobre el archivo mapeado."""
+    cantidad = 0
+    with open(ruta_archivo, 'rb') as archivo:
+        with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            for match in PATRON_LINEA_BYTES.finditer(mapa):
+                match.groups()
+                cantidad += 1
+    return cantidad
+
+
+def analisis_original(ruta_archivo):
+    """El bucle completo del analizador original: re.match, strptime y lista de fechas."""
+    niveles = Counter()
+    errores = Counter()
+    fechas = []
+    with open(ruta_archivo, 'r') as archivo:
+        for linea in archivo:
+            match = re.match(PATRON_LINEA, linea.strip())
+            if match:
+                fecha_str, nivel, mensaje = match.groups()
+                niveles[nivel] += 1
+                if nivel == "ERROR":
+                    errores[mensaje] += 1
+                try:
+                    fechas.append(datetime.strptime(fecha_str, FORMATO_FECHA))
+                except ValueError:
+                    pass
+    return sum(niveles.values())
+
+
+def analisis_completo(ruta_archivo):
+    """Análisis completo de un solo proceso, con fechas en memoria acotada."""
+    acumulador = analizar_fragmento(ruta_archivo, opciones={'guardar_fechas': False})
+    return sum(acumulador.niveles.values())
+
+
+VARIANTES = [
+    ('re.match + strip (original)', parser_original),
+    ('patrón compilado + strip', parser_compilado),
+    ('finditer sobre mmap', parser_finditer),
+    ('split sobre bytes (analizador)', parser_split),
+    ('análisis original completo', analisis_original),
+    ('analizar_fragmento completo', analisis_completo),
+]
+
+
+def benchmark_fechas(cantidad=500000):
+    """Compara strptime con parsear_fecha en ambos formatos."""
+    print(f"=== CONVERSIÓN DE FECHAS ({cantidad} líneas) ===")
+    for nombre, formato, asctime in [('app_server.log', FORMATO_FECHA, False),
+                                     ('asctime', FORMATO_ASCTIME, True)]:
+        fechas = generar_fechas(cantidad, asctime)
+        _, antes = medir(lambda: [datetime.strptime(fecha_str, formato) for fecha_str in fechas])
+        _, despues = medir(lambda: [parsear_fecha(fecha_str) for fecha_str in fechas])
+        print(f"  {nombre}:")
+        print(f"    strptime:      {cantidad / antes:12,.0f} líneas/s")
+        print(f"    parsear_fecha: {cantidad / despues:12,.0f} líneas/s  (x{antes / despues:.1f})")
+
+
+def benchmark_parser(cantidades, directorio=None, conservar=False):
+    """Genera un log por cada cantidad de líneas y mide cada variante de parser."""
+    directorio = directorio or tempfile.gettempdir()
+    for cantidad in cantidades:
+        ruta = os.path.join(directorio, f'benchmark_{cantidad}.log')
+        # Un log que ya existía (por ejemplo, de una corrida con --conservar) se reutiliza y no se borra
+        generado = not os.path.exists(ruta)
+        if generado:
+            print(f"Generando {ruta}...")
+            generar_log(ruta, cantidad)
+
+        tamano_mb = os.path.getsize(ruta) / (1024 * 1024)
+        print(f"\n=== PARSER: {cantidad:,} líneas ({tamano_mb:.0f} MB) ===")
+        referencia = None
+        for nombre, funcion in VARIANTES:
+            lineas, segundos = medir(funcion, ruta)
+            if referencia is None:
+                referencia = segundos
+            print(f"  {nombre:30} {cantidad / segundos:12,.0f} líneas/s  "
+                  f"{segundos:8.2f} s  (x{referencia / segundos:.1f})  [{lineas} líneas válidas]")
+
+        if generado and not conservar:
+            os.remove(ruta)
+
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmarks del analizador de logs")
+    argumentos.add_argument('prueba', choices=['fechas', 'parser'], nargs='?', default='fechas')
+    argumentos.add_argument('--lineas', type=int, nargs='+',
+                            help="cantidad de líneas (fechas: 500000; parser: 1000000 10000000)")
+    argumentos.add_argument('--directorio', help="dónde generar los logs sintéticos")
+    argumentos.add_argument('--conservar', action='store_true', help="no borrar los logs generados")
+    opciones = argumentos.parse_args()
+
+    if opciones.prueba == 'fechas':
+        benchmark_fechas(opciones.lineas[0] if opciones.lineas else 500000)
+    else:
+        benchmark_parser(opciones.lineas or [1000000, 10000000], opciones.directorio, opciones.conservar)
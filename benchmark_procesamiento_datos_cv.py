@@ -0,0 +1,316 @@
+"""
+Benchmarks del procesamiento de ventas.
+
+- parser: genera CSV sintéticos de ventas (por defecto de 1M filas) y compara
+  cuántas filas por segundo se cargan con csv.DictReader + int/float/strptime
+  por fila (camino anterior) y con la lectura tipada por esquema de leer_ventas.
+- pipeline: genera CSV sintéticos (por defecto de 10k, 100k y 1M filas; se
+  admiten hasta decenas de millones) y mide el tiempo y el pico de memoria de
+  cada paso de ProcesadorVentas: cargar_datos (sin caché, escribiendo la caché
+  y desde la caché), analizar_datos, obtener_estadisticas, los informes CSV y
+  HTML, los gráficos, analizar_aproximado y procesar_por_bloques. Los
+  resultados se guardan en JSON; con --comparar se contrastan con una corrida
+  anterior y se marcan las regresiones.
+
+Los CSV se generan con una semilla fija, así que cada tamaño es siempre el
+mismo archivo. La cantidad de productos crece con el tamaño (como en un
+catálogo real) y su popularidad sigue una ley de Zipf.
+
+Uso:
+    python benchmark_procesamiento_datos_cv.py parser --filas 1000000
+    python benchmark_procesamiento_datos_cv.py pipeline --filas 10000 100000 1000000
+    python benchmark_procesamiento_datos_cv.py pipeline --comparar benchmark_anterior.json
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from procesamiento_datos_cv import ProcesadorVentas, leer_ventas, ruta_cache, FORMATO_FECHA_VENTAS
+
+
+# Filas que se generan por vez al escribir los CSV sintéticos
+TAMANO_BLOQUE_GENERACION = 500000
+
+
+def productos_para(cantidad):
+    """Cantidad de productos distintos para un archivo de 'cantidad' filas (crece como la raíz)."""
+    return max(100, min(200000, int(10 * cantidad ** 0.5)))
+
+
+def generar_ventas(ruta_archivo, cantidad, semilla=42, productos=None, categorias=40, dias=730):
+    """
+    Escribe un CSV de ventas sintético con las columnas de ventas.csv.
+
+    Cada producto tiene una categoría y un precio fijos (lognormal, alrededor
+    de 50). La popularidad sigue una ley de Zipf, así que unos pocos productos
+    concentran la mayoría de las ventas, como en datos reales. Las fechas
+    cubren 'dias' días desde 2022-01-01 y las cantidades son geométricas.
+    """
+    productos = productos or productos_para(cantidad)
+    generador = np.random.default_rng(semilla)
+
+    nombres = [f'Producto {indice}' for indice in range(productos)]
+    categoria_producto = generador.integers(categorias, size=productos)
+    nombres_categorias = [f'Categoría {indice}' for indice in range(categorias)]
+    categoria_texto = [nombres_categorias[categoria] for categoria in categoria_producto.tolist()]
+    precios = np.round(generador.lognormal(np.log(50), 1.0, size=productos), 2) + 0.01
+    precio_texto = [f'{precio:.2f}' for precio in precios.tolist()]
+    popularidad = 1 / np.arange(1, productos + 1) ** 1.1
+    popularidad /= popularidad.sum()
+
+    inicio = date(2022, 1, 1)
+    fechas = [(inicio + timedelta(days=dia)).isoformat() for dia in range(dias)]
+
+    with open(ruta_archivo, 'w', newline='', encoding='utf-8') as archivo_csv:
+        archivo_csv.write('fecha,producto,categoria,cantidad,precio\n')
+        for desde in range(0, cantidad, TAMANO_BLOQUE_GENERACION):
+            filas = min(TAMANO_BLOQUE_GENERACION, cantidad - desde)
+            dia = generador.integers(dias, size=filas).tolist()
+            producto = generador.choice(productos, size=filas, p=popularidad).tolist()
+            unidades = generador.geometric(0.4, size=filas).tolist()
+            archivo_csv.write(''.join([
+                f'{fechas[d]},{nombres[p]},{categoria_texto[p]},{u},{precio_texto[p]}\n'
+                for d, p, u in zip(dia, producto, unidades)
+            ]))
+
+
+def medir(funcion, *args):
+    """Ejecuta la función y devuelve (resultado, segundos)."""
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+# --- Variantes de carga para la comparación ---
+
+def carga_dictreader(ruta_archivo):
+    """Como el cargar_datos original: DictReader y un diccionario con tipos convertidos por fila."""
+    datos = []
+    with open(ruta_archivo, 'r', newline='', encoding='utf-8') as archivo_csv:
+        for fila in csv.DictReader(archivo_csv):
+            fila['cantidad'] = int(fila['cantidad'])
+            fila['precio'] = float(fila['precio'])
+            fila['fecha'] = datetime.strptime(fila['fecha'], FORMATO_FECHA_VENTAS)
+            fila['total'] = fila['cantidad'] * fila['precio']
+            datos.append(fila)
+    return len(datos)
+
+
+def carga_reader(ruta_archivo):
+    """Sólo csv.reader, sin convertir nada: el límite inferior de cualquier parser en Python."""
+    with open(ruta_archivo, 'r', newline='', encoding='utf-8') as archivo_csv:
+        return sum(1 for _ in csv.reader(archivo_csv)) - 1
+
+
+def carga_tipada(ruta_archivo):
+    """leer_ventas: csv.reader por posición, conversión por columnas y caché de fechas."""
+    return sum(len(datos) for datos in leer_ventas(ruta_archivo))
+
+
+VARIANTES = [
+    ('DictReader + strptime (original)', carga_dictreader),
+    ('csv.reader sin convertir', carga_reader),
+    ('lectura tipada (leer_ventas)', carga_tipada),
+]
+
+
+def benchmark_parser(cantidades, directorio=None, conservar=False):
+    """Genera un CSV por cada cantidad de filas y mide cada variante de carga."""
+    directorio = directorio or tempfile.gettempdir()
+    for cantidad in cantidades:
+        ruta = os.path.join(directorio, f'benchmark_ventas_{cantidad}_42.csv')
+        if not os.path.exists(ruta):
+            print(f"Generando {ruta}...")
+            generar_ventas(ruta, cantidad)
+
+        tamano_mb = os.path.getsize(ruta) / (1024 * 1024)
+        print(f"\n=== CARGA: {cantidad:,} filas ({tamano_mb:.0f} MB) ===")
+        referencia = None
+        for nombre, funcion in VARIANTES:
+            filas, segundos = medir(funcion, ruta)
+            if referencia is None:
+                referencia = segundos
+            print(f"  {nombre:34} {cantidad / segundos:12,.0f} filas/s  "
+                  f"{segundos:8.2f} s  (x{referencia / segundos:.1f})  [{filas} filas]")
+
+        if not conservar:
+            os.remove(ruta)
+
+
+# --- Pipeline completo de ProcesadorVentas ---
+
+PASOS_PIPELINE = [
+    ('cargar_datos', lambda procesador, directorio: procesador.cargar_datos()),
+    ('analizar_datos', lambda procesador, directorio: procesador.analizar_datos()),
+    ('obtener_estadisticas', lambda procesador, directorio: procesador.obtener_estadisticas() is not None),
+    ('generar_informe_csv',
+     lambda procesador, directorio: procesador.generar_informe_csv(os.path.join(directorio, 'informe.csv'))),
+    ('generar_informe_html',
+     lambda procesador, directorio: procesador.generar_informe_html(os.path.join(directorio, 'informe.html'))),
+    ('generar_graficos', lambda procesador, directorio: procesador.generar_graficos(directorio, procesos=1)),
+    ('analizar_aproximado', lambda procesador, directorio: procesador.analizar_aproximado(semilla=42) is not None),
+]
+
+
+def medir_paso(funcion, medir_memoria):
+    """
+    Ejecuta un paso y devuelve (resultado, segundos, pico en MB). El pico es
+    la memoria que el paso llegó a usar por encima de la que ya estaba en uso
+    al empezar (None si no se mide).
+    """
+    if medir_memoria:
+        actual = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    pico = (tracemalloc.get_traced_memory()[1] - actual) / (1024 * 1024) if medir_memoria else None
+    return resultado, segundos, pico
+
+
+def ejecutar_pipeline(ruta_archivo, medir_memoria):
+    """Corre cada paso del pipeline sobre el CSV y devuelve {paso: (segundos, pico_mb)}."""
+    mediciones = {}
+    if medir_memoria:
+        tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory() as directorio:
+            procesador = ProcesadorVentas(ruta_archivo, usar_cache=False)
+            for nombre, paso in PASOS_PIPELINE:
+                resultado, segundos, pico = medir_paso(lambda: paso(procesador, directorio), medir_memoria)
+                if not resultado:
+                    raise RuntimeError(f"Falló el paso {nombre}")
+                mediciones[nombre] = (segundos, pico)
+            del procesador
+
+            # Caché binaria: la primera carga la escribe y la segunda la usa
+            shutil.rmtree(ruta_cache(ruta_archivo), ignore_errors=True)
+            for nombre in ('cargar_datos (escribe caché)', 'cargar_datos (desde caché)'):
+                procesador = ProcesadorVentas(ruta_archivo)
+                _, segundos, pico = medir_paso(procesador.cargar_datos, medir_memoria)
+                mediciones[nombre] = (segundos, pico)
+                del procesador
+            shutil.rmtree(ruta_cache(ruta_archivo), ignore_errors=True)
+
+            procesador = ProcesadorVentas(ruta_archivo, usar_cache=False)
+            _, segundos, pico = medir_paso(procesador.procesar_por_bloques, medir_memoria)
+            mediciones['procesar_por_bloques'] = (segundos, pico)
+    finally:
+        if medir_memoria:
+            tracemalloc.stop()
+    return mediciones
+
+
+def benchmark_pipeline(cantidades, directorio=None, conservar=False, medir_memoria=True, semilla=42):
+    """
+    Mide el pipeline para cada cantidad de filas. El tiempo se mide en una
+    corrida sin tracemalloc (que lo distorsiona) y la memoria en otra.
+    Devuelve la lista de resultados.
+    """
+    directorio = directorio or tempfile.gettempdir()
+    resultados = []
+    for cantidad in cantidades:
+        ruta = os.path.join(directorio, f'benchmark_ventas_{cantidad}_{semilla}.csv')
+        if not os.path.exists(ruta):
+            print(f"Generando {ruta}...")
+            generar_ventas(ruta, cantidad, semilla)
+
+        tamano_mb = os.path.getsize(ruta) / (1024 * 1024)
+        print(f"\n=== PIPELINE: {cantidad:,} filas ({tamano_mb:.0f} MB, {productos_para(cantidad)} productos) ===")
+        tiempos = ejecutar_pipeline(ruta, medir_memoria=False)
+        memoria = ejecutar_pipeline(ruta, medir_memoria=True) if medir_memoria else {}
+
+        for paso, (segundos, _) in tiempos.items():
+            pico = memoria.get(paso, (None, None))[1]
+            resultados.append({
+                'filas': cantidad,
+                'paso': paso,
+                'segundos': segundos,
+                'filas_por_segundo': cantidad / segundos if segundos else None,
+                'pico_mb': pico
+            })
+            texto_pico = f"{pico:10.1f} MB" if pico is not None else ''
+            print(f"  {paso:30} {segundos:10.4f} s  {texto_pico}")
+
+        if not conservar:
+            os.remove(ruta)
+    return resultados
+
+
+def guardar_resultados(ruta_salida, resultados, semilla):
+    """Guarda los resultados en JSON junto con datos del entorno, para comparar corridas."""
+    contenido = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+        'nucleos': os.cpu_count(),
+        'semilla': semilla,
+        'resultados': resultados
+    }
+    with open(ruta_salida, 'w', encoding='utf-8') as archivo:
+        json.dump(contenido, archivo, ensure_ascii=False, indent=2)
+    print(f"\nResultados guardados en {ruta_salida}")
+
+
+def comparar_resultados(ruta_anterior, resultados, tolerancia=0.2):
+    """
+    Compara con una corrida anterior y marca como regresión cada paso que tardó
+    o usó memoria más de 'tolerancia' (20 %) por encima de antes.
+    """
+    with open(ruta_anterior, 'r', encoding='utf-8') as archivo:
+        anteriores = {(r['filas'], r['paso']): r for r in json.load(archivo)['resultados']}
+
+    print(f"\n=== COMPARACIÓN CON {ruta_anterior} ===")
+    regresiones = 0
+    for resultado in resultados:
+        anterior = anteriores.get((resultado['filas'], resultado['paso']))
+        if not anterior:
+            continue
+        for medida, unidad in (('segundos', 's'), ('pico_mb', 'MB')):
+            antes, ahora = anterior.get(medida), resultado.get(medida)
+            if not antes or ahora is None:
+                continue
+            cambio = ahora / antes - 1
+            marca = '  REGRESIÓN' if cambio > tolerancia else ''
+            regresiones += bool(marca)
+            print(f"  {resultado['filas']:>10,} {resultado['paso']:30} {medida:9} "
+                  f"{antes:10.4f} -> {ahora:10.4f} {unidad} ({cambio:+.0%}){marca}")
+    print(f"Regresiones: {regresiones}")
+    return regresiones
+
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmarks del procesamiento de ventas")
+    argumentos.add_argument('prueba', choices=['parser', 'pipeline'], nargs='?', default='parser')
+    argumentos.add_argument('--filas', type=int, nargs='+',
+                            help="cantidad de filas (parser: 1000000; pipeline: 10000 100000 1000000)")
+    argumentos.add_argument('--directorio', help="dónde generar los CSV sintéticos")
+    argumentos.add_argument('--conservar', action='store_true', help="no borrar los CSV generados")
+    argumentos.add_argument('--semilla', type=int, default=42, help="semilla de los datos sintéticos")
+    argumentos.add_argument('--sin-memoria', action='store_true', help="pipeline: no medir el pico de memoria")
+    argumentos.add_argument('--salida', default='benchmark_procesamiento_datos_cv.json',
+                            help="pipeline: archivo JSON de resultados")
+    argumentos.add_argument('--comparar', help="pipeline: JSON de una corrida anterior para detectar regresiones")
+    opciones = argumentos.parse_args()
+
+    if opciones.prueba == 'parser':
+        benchmark_parser(opciones.filas or [1000000], opciones.directorio, opciones.conservar)
+    else:
+        resultados = benchmark_pipeline(opciones.filas or [10000, 100000, 1000000], opciones.directorio,
+                                        opciones.conservar, not opciones.sin_memoria, opciones.semilla)
+        guardar_resultados(opciones.salida, resultados, opciones.semilla)
+        if opciones.comparar:
+            comparar_resultados(opciones.comparar, resultados)
@@ -9,40 +9,1509 @@ Generar un informe en formato CSV o HTML
 Crear visualizaciones básicas (opcional)
 """
 
+import gc
+import io
 import csv
+import math
+import glob
+import json
+import time
+import shutil
+import errno
+import heapq
+import random
+import hashlib
 from datetime import datetime
+from html import escape
+from functools import lru_cache
+from itertools import chain, islice
+from operator import itemgetter
+from statistics import NormalDist
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import os
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
+import numpy as np
+
+
+ORDINAL_EPOCA = datetime(1970, 1, 1).toordinal()
+
+
+class DatosVentas:
+    """
+    Ventas en formato columnar: un arreglo de NumPy por columna.
+
+    'producto' y 'categoria' se guardan codificados como enteros (codificación
+    por diccionario); los nombres correspondientes están en 'productos' y
+    'categorias', en orden de primera aparición. 'fecha' es datetime64[D].
+    """
+
+    # Columnas que se guardan en la caché binaria
+    COLUMNAS = ('fecha', 'producto', 'categoria', 'cantidad', 'precio', 'total')
+
+    def __init__(self, fecha, producto, categoria, cantidad, precio, productos, categorias, total=None):
+        self.fecha = fecha
+        self.producto = producto
+        self.categoria = categoria
+        self.cantidad = cantidad
+        self.precio = precio
+        self.total = cantidad * precio if total is None else total
+        self.productos = productos
+        self.categorias = categorias
+
+    def __len__(self):
+        return len(self.fecha)
+
+    def fila(self, indice):
+        """Devuelve la venta en la posición indicada como diccionario, igual que DictReader."""
+        return {
+            'fecha': datetime.fromordinal(int(self.fecha[indice].astype(np.int64)) + ORDINAL_EPOCA),
+            'producto': self.productos[self.producto[indice]],
+            'categoria': self.categorias[self.categoria[indice]],
+            'cantidad': int(self.cantidad[indice]),
+            'precio': float(self.precio[indice]),
+            'total': float(self.total[indice])
+        }
+
+    def __iter__(self):
+        for indice in range(len(self)):
+            yield self.fila(indice)
+
+
+def sumar_por_codigo(destino, codigos, valores, nombres):
+    """
+    Suma los valores agrupados por código entero (group-by vectorizado con
+    bincount) y los acumula en 'destino' con el nombre de cada código.
+    Sólo se agregan los códigos que aparecen en el bloque.
+    """
+    cantidad_codigos = len(nombres)
+    sumas = np.bincount(codigos, weights=valores, minlength=cantidad_codigos).astype(valores.dtype, copy=False)
+    presentes = np.flatnonzero(np.bincount(codigos, minlength=cantidad_codigos))
+    for codigo, suma in zip(presentes.tolist(), sumas[presentes].tolist()):
+        destino[nombres[codigo]] += suma
+
+
+def sumar_por_mes(fechas, valores):
+    """
+    Suma los valores por mes. Devuelve (claves 'YYYY-MM', sumas) en orden
+    cronológico, sólo con los meses que tienen ventas.
+    """
+    if not len(fechas):
+        return [], []
+    meses = fechas.astype('datetime64[M]').astype(np.int64)
+    primero = meses.min()
+    indices = meses - primero
+    sumas = np.bincount(indices, weights=valores)
+    presentes = np.flatnonzero(np.bincount(indices))
+    claves = np.datetime_as_string((presentes + primero).astype('datetime64[M]'), unit='M')
+    return claves.tolist(), sumas[presentes].tolist()
+
+
+def resolver_rutas(rutas):
+    """
+    Convierte una ruta, un patrón glob ('ventas/*.csv') o una lista de ellos en
+    la lista de archivos a procesar, sin repetidos.
+    """
+    if isinstance(rutas, (str, os.PathLike)):
+        rutas = [rutas]
+
+    resultado = []
+    for ruta in rutas:
+        ruta = os.fspath(ruta)
+        if any(caracter in ruta for caracter in '*?['):
+            coincidencias = sorted(glob.glob(ruta))
+        else:
+            coincidencias = [ruta] if os.path.exists(ruta) else []
+        if not coincidencias:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), ruta)
+        for coincidencia in coincidencias:
+            if coincidencia not in resultado:
+                resultado.append(coincidencia)
+    return resultado
+
+
+# Esquema del CSV de ventas: columna -> tipo. Las columnas se buscan por nombre
+# en el encabezado, así que su orden en el archivo no importa.
+ESQUEMA_VENTAS = {
+    'fecha': 'fecha',
+    'producto': 'categorico',
+    'categoria': 'categorico',
+    'cantidad': 'entero',
+    'precio': 'decimal',
+}
+
+FORMATO_FECHA_VENTAS = '%Y-%m-%d'
+
+# Filas que se convierten juntas al leer el CSV
+TAMANO_LOTE_CSV = 65536
+
+
+class CacheFechas(dict):
+    """
+    Fecha en texto -> días desde 1970. Muchas ventas comparten el mismo día,
+    así que strptime se llama una sola vez por fecha distinta.
+    """
+
+    def __missing__(self, texto):
+        dias = self[texto] = datetime.strptime(texto, FORMATO_FECHA_VENTAS).toordinal() - ORDINAL_EPOCA
+        return dias
+
+
+class Codificador(dict):
+    """Valor -> código entero por orden de primera aparición; 'nombres' tiene el valor de cada código."""
+
+    def __init__(self):
+        super().__init__()
+        self.nombres = []
+
+    def __missing__(self, valor):
+        codigo = self[valor] = len(self.nombres)
+        self.nombres.append(valor)
+        return codigo
+
+
+def indices_esquema(encabezado, esquema=ESQUEMA_VENTAS):
+    """Devuelve {columna: posición} para las columnas del esquema según el encabezado del CSV."""
+    if encabezado is None:
+        return None
+    posiciones = {nombre.strip(): indice for indice, nombre in enumerate(encabezado)}
+    faltantes = [columna for columna in esquema if columna not in posiciones]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(faltantes)}")
+    return {columna: posiciones[columna] for columna in esquema}
+
+
+def convertir_filas(filas, indices, cache_fechas, codificadores, esquema=ESQUEMA_VENTAS):
+    """
+    Convierte un lote de filas de csv.reader en un DatosVentas. Cada columna se
+    extrae por posición y se convierte de una sola vez según su tipo en el esquema.
+    """
+    cantidad_filas = len(filas)
+    columnas = {}
+    for columna, tipo in esquema.items():
+        valores = map(itemgetter(indices[columna]), filas)
+        if tipo == 'fecha':
+            columnas[columna] = np.fromiter(map(cache_fechas.__getitem__, valores), np.int64,
+                                            cantidad_filas).view('datetime64[D]')
+        elif tipo == 'categorico':
+            columnas[columna] = np.fromiter(map(codificadores[columna].__getitem__, valores), np.int32,
+                                            cantidad_filas)
+        elif tipo == 'entero':
+            columnas[columna] = np.fromiter(map(int, valores), np.int64, cantidad_filas)
+        elif tipo == 'decimal':
+            columnas[columna] = np.fromiter(map(float, valores), np.float64, cantidad_filas)
+        else:
+            raise ValueError(f"Tipo de columna desconocido: {tipo}")
+
+    # El total de cada venta se calcula en DatosVentas
+    return DatosVentas(
+        productos=codificadores['producto'].nombres,
+        categorias=codificadores['categoria'].nombres,
+        **columnas
+    )
+
+
+def leer_lote(lector, cantidad):
+    """
+    Lee hasta 'cantidad' filas del lector. El recolector de basura se pausa
+    mientras tanto: cada fila es una lista nueva que no forma ciclos, y
+    dejarlo activo lo hace recorrer el lote una y otra vez (un tercio del
+    tiempo de carga).
+    """
+    activo = gc.isenabled()
+    gc.disable()
+    try:
+        return list(islice(lector, cantidad))
+    finally:
+        if activo:
+            gc.enable()
+
+
+def leer_ventas(ruta_archivo, tamano_bloque=None, codigos=None):
+    """
+    Lee el CSV de ventas y genera bloques DatosVentas de hasta 'tamano_bloque'
+    filas (todo el archivo en un solo bloque si es None).
+
+    Las filas se leen con csv.reader en lotes de TAMANO_LOTE_CSV y cada columna
+    del esquema se convierte por posición en bloque, sin diccionarios por fila;
+    las fechas pasan por un CacheFechas. Los códigos de producto y categoría se
+    comparten entre bloques, así que respetan el orden de primera aparición en
+    todo el archivo. Para compartirlos también entre archivos se puede pasar
+    'codigos' = (productos, categorias), dos Codificador.
+    """
+    with open(ruta_archivo, 'r', newline='', encoding='utf-8') as archivo_csv:
+        # Como DictReader, se saltean las líneas vacías
+        lector = filter(None, csv.reader(archivo_csv))
+        indices = indices_esquema(next(lector, None))
+        if indices is None:
+            return
+        yield from convertir_lector(lector, indices, tamano_bloque, codigos)
+
+
+def convertir_lector(lector, indices, tamano_bloque=None, codigos=None):
+    """Convierte las filas de un csv.reader en bloques DatosVentas (ver leer_ventas)."""
+    productos, categorias = codigos if codigos else (Codificador(), Codificador())
+    codificadores = {'producto': productos, 'categoria': categorias}
+    cache_fechas = CacheFechas()
+
+    while True:
+        lotes = []
+        pendientes = tamano_bloque
+        while pendientes is None or pendientes > 0:
+            filas = leer_lote(lector, TAMANO_LOTE_CSV if pendientes is None else min(pendientes, TAMANO_LOTE_CSV))
+            if not filas:
+                break
+            lotes.append(convertir_filas(filas, indices, cache_fechas, codificadores))
+            if pendientes is not None:
+                pendientes -= len(filas)
+
+        if not lotes:
+            return
+        yield concatenar_datos(lotes)
+        if pendientes is None or pendientes > 0:
+            # Se terminaron las filas
+            return
+
+
+def concatenar_datos(bloques):
+    """Une bloques DatosVentas que comparten los códigos de producto y categoría."""
+    if len(bloques) == 1:
+        return bloques[0]
+    return DatosVentas(
+        np.concatenate([datos.fecha for datos in bloques]),
+        np.concatenate([datos.producto for datos in bloques]),
+        np.concatenate([datos.categoria for datos in bloques]),
+        np.concatenate([datos.cantidad for datos in bloques]),
+        np.concatenate([datos.precio for datos in bloques]),
+        bloques[-1].productos,
+        bloques[-1].categorias,
+        total=np.concatenate([datos.total for datos in bloques])
+    )
+
+
+def recodificar_datos(bloques):
+    """
+    Pasa bloques DatosVentas con códigos propios (por ejemplo, de distintos
+    archivos o cachés) a un mismo par de Codificador, para poder unirlos.
+    """
+    productos = Codificador()
+    categorias = Codificador()
+    for datos in bloques:
+        mapa_productos = np.fromiter(map(productos.__getitem__, datos.productos), np.int32, len(datos.productos))
+        mapa_categorias = np.fromiter(map(categorias.__getitem__, datos.categorias), np.int32, len(datos.categorias))
+        yield DatosVentas(
+            datos.fecha,
+            mapa_productos[datos.producto],
+            mapa_categorias[datos.categoria],
+            datos.cantidad,
+            datos.precio,
+            productos.nombres,
+            categorias.nombres,
+            total=datos.total
+        )
+
+
+# --- Caché binaria de los datos ya convertidos ---
+
+# La caché de 'ventas.csv' es el directorio 'ventas.csv.cache', con meta.json
+# (identidad del CSV: tamaño, fecha de modificación y SHA-256; nombres de
+# productos y categorías) y un subdirectorio por versión de los datos, con un
+# .npy por columna. meta.json indica qué subdirectorio está vigente.
+SUFIJO_CACHE = '.cache'
+VERSION_CACHE = 1
+
+
+def ruta_cache(ruta_archivo):
+    """Devuelve el directorio de la caché binaria de un CSV."""
+    return ruta_archivo + SUFIJO_CACHE
+
+
+def calcular_hash(ruta_archivo, tamano_bloque=1024 * 1024):
+    """Calcula el SHA-256 del contenido del archivo."""
+    resumen = hashlib.sha256()
+    with open(ruta_archivo, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(tamano_bloque), b''):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def cargar_cache(ruta_archivo):
+    """
+    Devuelve los DatosVentas de la caché si sigue correspondiendo al CSV, o
+    None. Las columnas se mapean en memoria (sin copiarlas), así que cargar
+    es casi instantáneo sin importar el tamaño.
+
+    Si el tamaño y la fecha de modificación coinciden, la caché se da por
+    vigente sin leer el CSV. Si sólo cambió la fecha, se compara el SHA-256
+    del contenido y, si es el mismo, se actualiza la fecha guardada.
+    """
+    directorio = ruta_cache(ruta_archivo)
+    ruta_meta = os.path.join(directorio, 'meta.json')
+    try:
+        with open(ruta_meta, 'r', encoding='utf-8') as archivo_meta:
+            meta = json.load(archivo_meta)
+    except (OSError, ValueError):
+        return None
+
+    estado = os.stat(ruta_archivo)
+    if meta.get('version') != VERSION_CACHE or meta.get('tamano') != estado.st_size:
+        return None
+    if meta.get('mtime_ns') != estado.st_mtime_ns:
+        if calcular_hash(ruta_archivo) != meta.get('sha256'):
+            return None
+        meta['mtime_ns'] = estado.st_mtime_ns
+        try:
+            guardar_json(ruta_meta, meta)
+        except OSError:
+            # Sólo evita recalcular el hash la próxima vez: la caché sigue
+            # siendo válida aunque no se pueda escribir (directorio de sólo lectura)
+            pass
+
+    try:
+        columnas = {
+            columna: np.load(os.path.join(directorio, meta['columnas'], f'{columna}.npy'), mmap_mode='r')
+            for columna in DatosVentas.COLUMNAS
+        }
+    except (OSError, ValueError, KeyError):
+        return None
+    if any(len(columna) != meta['filas'] for columna in columnas.values()):
+        return None
+    return DatosVentas(productos=meta['productos'], categorias=meta['categorias'], **columnas)
+
+
+def guardar_cache(ruta_archivo, datos, estado, sha256):
+    """
+    Escribe la caché binaria de un CSV.
+
+    Los .npy de la caché anterior pueden estar mapeados en memoria por este u
+    otros procesos, y truncarlos haría que esos procesos mueran al leerlos
+    (SIGBUS). Por eso las columnas nuevas se escriben en un subdirectorio
+    nuevo y meta.json se reemplaza de forma atómica para apuntar a él. Los
+    subdirectorios anteriores se borran después: donde el sistema lo permite
+    (POSIX), los mapeos abiertos siguen siendo válidos hasta que se cierran.
+    """
+    directorio = ruta_cache(ruta_archivo)
+    ruta_meta = os.path.join(directorio, 'meta.json')
+    os.makedirs(directorio, exist_ok=True)
+    version = f'datos-{time.time_ns()}-{os.getpid()}'
+    os.makedirs(os.path.join(directorio, version))
+
+    for columna in DatosVentas.COLUMNAS:
+        np.save(os.path.join(directorio, version, f'{columna}.npy'), getattr(datos, columna))
+
+    guardar_json(ruta_meta, {
+        'version': VERSION_CACHE,
+        'columnas': version,
+        'tamano': estado.st_size,
+        'mtime_ns': estado.st_mtime_ns,
+        'sha256': sha256,
+        'filas': len(datos),
+        'productos': list(datos.productos),
+        'categorias': list(datos.categorias)
+    })
+
+    # Otro proceso pudo haber guardado su versión mientras tanto: se conserva
+    # la que quedó vigente además de la propia
+    try:
+        with open(ruta_meta, 'r', encoding='utf-8') as archivo_meta:
+            vigente = json.load(archivo_meta).get('columnas')
+    except (OSError, ValueError):
+        vigente = version
+    for nombre in os.listdir(directorio):
+        anterior = os.path.join(directorio, nombre)
+        if nombre in (version, vigente):
+            continue
+        if os.path.isdir(anterior):
+            shutil.rmtree(anterior, ignore_errors=True)
+
+
+def guardar_json(ruta_archivo, contenido):
+    """Escribe un JSON de forma atómica (archivo temporal + os.replace)."""
+    temporal = ruta_archivo + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(contenido, archivo, ensure_ascii=False)
+    os.replace(temporal, ruta_archivo)
+
+
+def cargar_ventas(ruta_archivo, usar_cache=True):
+    """
+    Devuelve todos los DatosVentas de un CSV (None si no tiene filas). Con
+    usar_cache, se usa la caché binaria si está vigente y, si no, se lee el CSV
+    y se escribe la caché para las próximas ejecuciones.
+    """
+    if usar_cache:
+        datos = cargar_cache(ruta_archivo)
+        if datos is not None:
+            return datos
+
+    estado = os.stat(ruta_archivo)
+    bloques = list(leer_ventas(ruta_archivo))
+    if not bloques:
+        return None
+    datos = bloques[0]
+
+    if usar_cache:
+        sha256 = calcular_hash(ruta_archivo)
+        actual = os.stat(ruta_archivo)
+        # Si el CSV cambió mientras se leía, no se guarda una caché que no le corresponde
+        if (actual.st_size, actual.st_mtime_ns) == (estado.st_size, estado.st_mtime_ns):
+            try:
+                guardar_cache(ruta_archivo, datos, estado, sha256)
+            except OSError as e:
+                print(f"No se pudo guardar la caché de {ruta_archivo}: {e}")
+    return datos
+
+
+class AgregadosVentas:
+    """
+    Agregados de ventas que se actualizan bloque a bloque: cantidad vendida por
+    producto, ventas por mes y por categoría, y los totales generales.
+    """
+
+    def __init__(self):
+        self.productos = defaultdict(int)
+        self.ventas_por_mes = defaultdict(float)
+        self.ventas_por_categoria = defaultdict(float)
+        self.total_ventas = 0.0
+        self.cantidad_total = 0
+        self.filas = 0
+
+    def agregar_datos(self, datos):
+        """Suma un bloque DatosVentas a los agregados."""
+        if not len(datos):
+            return
+
+        # Contar productos vendidos
+        sumar_por_codigo(self.productos, datos.producto, datos.cantidad, datos.productos)
+
+        # Sumar ventas por mes
+        for mes, ventas in zip(*sumar_por_mes(datos.fecha, datos.total)):
+            self.ventas_por_mes[mes] += ventas
+
+        # Sumar ventas por categoría
+        sumar_por_codigo(self.ventas_por_categoria, datos.categoria, datos.total, datos.categorias)
+
+        self.total_ventas += float(datos.total.sum())
+        self.cantidad_total += int(datos.cantidad.sum())
+        self.filas += len(datos)
+
+    def combinar(self, otro):
+        """Suma los agregados de otro AgregadosVentas (por ejemplo, de otro archivo)."""
+        for producto, cantidad in otro.productos.items():
+            self.productos[producto] += cantidad
+        for mes, ventas in otro.ventas_por_mes.items():
+            self.ventas_por_mes[mes] += ventas
+        for categoria, ventas in otro.ventas_por_categoria.items():
+            self.ventas_por_categoria[categoria] += ventas
+        self.total_ventas += otro.total_ventas
+        self.cantidad_total += otro.cantidad_total
+        self.filas += otro.filas
+
+    def a_dict(self):
+        """Convierte los agregados a un diccionario serializable en JSON."""
+        return {
+            'productos': dict(self.productos),
+            'ventas_por_mes': dict(self.ventas_por_mes),
+            'ventas_por_categoria': dict(self.ventas_por_categoria),
+            'total_ventas': self.total_ventas,
+            'cantidad_total': self.cantidad_total,
+            'filas': self.filas
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Reconstruye los agregados guardados con a_dict()."""
+        agregados = cls()
+        agregados.productos.update(datos['productos'])
+        agregados.ventas_por_mes.update(datos['ventas_por_mes'])
+        agregados.ventas_por_categoria.update(datos['ventas_por_categoria'])
+        agregados.total_ventas = datos['total_ventas']
+        agregados.cantidad_total = datos['cantidad_total']
+        agregados.filas = datos['filas']
+        return agregados
+
+
+def agregar_archivo(ruta_archivo, tamano_bloque=None):
+    """Lee un CSV de ventas por bloques y devuelve sus AgregadosVentas (se ejecuta en cada proceso)."""
+    agregados = AgregadosVentas()
+    for datos in leer_ventas(ruta_archivo, tamano_bloque):
+        agregados.agregar_datos(datos)
+    return agregados
+
+
+TAMANO_BLOQUE_VENTAS = 100000
+
+# Cantidad de productos más vendidos en las estadísticas
+TOP_PRODUCTOS = 5
+
+
+# --- Actualización incremental de CSV a los que sólo se agregan filas ---
+
+# Bytes que se leen por vez al procesar lo agregado a un CSV
+TAMANO_BLOQUE_INCREMENTAL = 16 * 1024 * 1024
+
+# Bytes anteriores a la posición guardada que se comparan para detectar si el
+# archivo se reescribió en lugar de sólo crecer
+TAMANO_FIRMA = 1024
+
+
+def firma_previa(archivo, posicion):
+    """SHA-256 de los TAMANO_FIRMA bytes anteriores a 'posicion' en el archivo binario."""
+    inicio = max(0, posicion - TAMANO_FIRMA)
+    archivo.seek(inicio)
+    return hashlib.sha256(archivo.read(posicion - inicio)).hexdigest()
+
+
+def fin_ultima_fila(bloque):
+    """
+    Devuelve dónde termina la última fila completa de un bloque que empieza
+    al principio de una fila (0 si no tiene ninguna): después del último salto
+    de línea que no está dentro de un campo entre comillas.
+    """
+    fin = bloque.rfind(b'\n')
+    # Un salto está fuera de comillas si antes hay una cantidad par de ellas
+    # (las comillas escapadas "" suman dos y no cambian la paridad)
+    comillas = bloque.count(b'"', 0, fin) if fin >= 0 else 0
+    while comillas % 2:
+        anterior = bloque.rfind(b'\n', 0, fin)
+        comillas -= bloque.count(b'"', anterior + 1, fin)
+        fin = anterior
+    return fin + 1
+
+
+def leer_bloques_lineas(archivo, tamano_bloque, incluir_incompleta=True):
+    """
+    Genera bloques del archivo binario, desde su posición actual, que terminan
+    al final de una fila (ver fin_ultima_fila). Lo que queda al final sin
+    terminar se entrega como último bloque si 'incluir_incompleta'; si no, se
+    deja sin leer.
+    """
+    resto = b''
+    while True:
+        bloque = archivo.read(tamano_bloque)
+        if not bloque:
+            if resto and incluir_incompleta:
+                yield resto
+            return
+        bloque = resto + bloque
+        fin = fin_ultima_fila(bloque)
+        resto = bloque[fin:]
+        if fin:
+            yield bloque[:fin]
+
+
+def leer_ventas_desde(archivo, posicion, indices, tamano_bloque=TAMANO_BLOQUE_INCREMENTAL):
+    """
+    Genera (datos, posicion) con las filas completas escritas en el archivo
+    binario a partir de 'posicion'; 'posicion' es dónde termina lo ya leído y
+    'datos' puede ser None si un bloque no tenía filas. Una última fila sin
+    salto de línea se considera a medio escribir y queda para la próxima vez.
+    """
+    archivo.seek(posicion)
+    for bloque in leer_bloques_lineas(archivo, tamano_bloque, incluir_incompleta=False):
+        posicion += len(bloque)
+        lector = filter(None, csv.reader(io.StringIO(bloque.decode('utf-8'), newline='')))
+        bloques = list(convertir_lector(lector, indices))
+        yield (bloques[0] if bloques else None), posicion
+
+
+def actualizar_archivo(ruta_archivo, estado=None):
+    """
+    Suma a los agregados de 'estado' las filas agregadas al CSV desde la última
+    vez y devuelve el estado nuevo: inodo, posición en bytes, firma de los
+    bytes previos, posiciones de las columnas y AgregadosVentas del archivo.
+
+    Si el archivo es otro (inodo distinto), es más corto que la posición
+    guardada o cambiaron los últimos TAMANO_FIRMA bytes ya leídos, se vuelve
+    a procesar desde el principio. Cambios más atrás no se detectan: se
+    supone que al archivo sólo se le agregan filas.
+    Devuelve None si el archivo todavía no tiene un encabezado completo.
+    """
+    with open(ruta_archivo, 'rb') as archivo:
+        info = os.fstat(archivo.fileno())
+        if estado is not None and (
+                estado['inodo'] != info.st_ino
+                or info.st_size < estado['posicion']
+                or firma_previa(archivo, estado['posicion']) != estado['firma']):
+            estado = None
+
+        if estado is None:
+            archivo.seek(0)
+            encabezado = archivo.readline()
+            if not encabezado.endswith(b'\n'):
+                return None
+            estado = {
+                'inodo': info.st_ino,
+                'posicion': len(encabezado),
+                'indices': indices_esquema(next(csv.reader([encabezado.decode('utf-8')]), None)),
+                'agregados': AgregadosVentas()
+            }
+
+        for datos, posicion in leer_ventas_desde(archivo, estado['posicion'], estado['indices']):
+            if datos is not None:
+                estado['agregados'].agregar_datos(datos)
+            estado['posicion'] = posicion
+
+        estado['firma'] = firma_previa(archivo, estado['posicion'])
+    return estado
+
+
+def cargar_estado_incremental(ruta_checkpoint):
+    """Carga el estado incremental guardado ({ruta: estado}), o {} si no existe."""
+    if not os.path.exists(ruta_checkpoint):
+        return {}
+    with open(ruta_checkpoint, 'r', encoding='utf-8') as f:
+        estados = json.load(f)
+    for estado in estados.values():
+        estado['agregados'] = AgregadosVentas.desde_dict(estado['agregados'])
+    return estados
+
+
+def guardar_estado_incremental(ruta_checkpoint, estados):
+    """Guarda el estado incremental de cada archivo de forma atómica."""
+    guardar_json(ruta_checkpoint, {
+        ruta: dict(estado, agregados=estado['agregados'].a_dict())
+        for ruta, estado in estados.items()
+    })
+
+
+# --- Agrupaciones y tablas dinámicas ---
+
+def codificar_dimension(datos, dimension):
+    """
+    Devuelve (codigos, cantidad, etiquetar) para agrupar por una dimensión:
+    un código entero por fila entre 0 y cantidad - 1, y una función que
+    convierte códigos en etiquetas. Las dimensiones de fecha son días, semanas
+    ISO, meses o años desde la primera fecha, así los códigos son densos.
+    """
+    if dimension == 'producto':
+        nombres = np.array(datos.productos, dtype=object)
+        return datos.producto, len(nombres), lambda codigos: nombres[codigos].tolist()
+    if dimension == 'categoria':
+        nombres = np.array(datos.categorias, dtype=object)
+        return datos.categoria, len(nombres), lambda codigos: nombres[codigos].tolist()
+    if dimension not in DIMENSIONES_FECHA:
+        raise ValueError(f"Dimensión desconocida: {dimension}")
+
+    unidad = DIMENSIONES_FECHA[dimension]
+    if unidad == 'W':
+        # Semanas que empiezan el lunes: el 1970-01-01 fue jueves
+        valores = (datos.fecha.astype(np.int64) + 3) // 7
+    else:
+        valores = datos.fecha.astype(f'datetime64[{unidad}]').astype(np.int64)
+    primero = int(valores.min())
+    ultimo = int(valores.max())
+
+    def etiquetar(codigos):
+        valores = np.asarray(codigos, dtype=np.int64) + primero
+        if unidad == 'W':
+            lunes = (valores * 7 - 3).astype('datetime64[D]').astype(object)
+            return [f"{dia.isocalendar()[0]}-W{dia.isocalendar()[1]:02d}" for dia in lunes]
+        return np.datetime_as_string(valores.astype(f'datetime64[{unidad}]'), unit=unidad).tolist()
+
+    return valores - primero, ultimo - primero + 1, etiquetar
+
+
+# Dimensiones de fecha y su unidad de datetime64 ('W' son semanas ISO)
+DIMENSIONES_FECHA = {
+    'dia': 'D',
+    'semana': 'W',
+    'mes': 'M',
+    'anio': 'Y',
+}
+
+COLUMNAS_MEDIDAS = ('cantidad', 'precio', 'total')
+
+# Por encima de esta cantidad de combinaciones posibles, las claves de grupo se
+# comprimen con np.unique en lugar de contarse en un arreglo denso
+LIMITE_GRUPOS_DENSOS = 1 << 24
+
+
+def percentiles_por_grupo(valores_ordenados, inicios, cuentas, percentil):
+    """
+    Percentil (interpolación lineal, como np.percentile) de cada grupo, dados
+    los valores ordenados por grupo y por valor, y dónde empieza cada grupo.
+    """
+    posicion = (cuentas - 1) * (percentil / 100)
+    abajo = np.floor(posicion).astype(np.int64)
+    arriba = np.ceil(posicion).astype(np.int64)
+    bajo = valores_ordenados[inicios + abajo]
+    alto = valores_ordenados[inicios + arriba]
+    return bajo + (alto - bajo) * (posicion - abajo)
+
+
+def agrupar_datos(datos, agrupaciones, medidas):
+    """
+    Calcula varias agrupaciones sobre DatosVentas con operaciones vectorizadas.
+
+    agrupaciones: lista de tuplas de dimensiones, por ejemplo
+        [('producto', 'mes'), ('categoria', 'semana')]. Dimensiones: producto,
+        categoria, dia, semana, mes y anio.
+    medidas: diccionario nombre -> (funcion, columna[, percentil]), por ejemplo
+        {'ventas': ('suma', 'total'), 'filas': ('cuenta', None),
+         'p90_precio': ('percentil', 'precio', 90)}. Funciones: suma, cuenta,
+        media, minimo, maximo y percentil; columnas: cantidad, precio y total.
+
+    Los códigos de cada dimensión se calculan una sola vez y se comparten entre
+    todas las agrupaciones; cada agrupación combina los códigos de sus
+    dimensiones en una clave entera y suma con bincount. Los percentiles,
+    mínimos y máximos ordenan una vez por agrupación y columna.
+
+    Devuelve {agrupacion: tabla}, donde cada tabla es un diccionario de columnas:
+    una lista de etiquetas por dimensión y un arreglo de NumPy por medida, con
+    una fila por grupo que tiene ventas.
+    """
+    for nombre, medida in medidas.items():
+        funcion, columna = medida[0], medida[1]
+        if funcion not in ('suma', 'cuenta', 'media', 'minimo', 'maximo', 'percentil'):
+            raise ValueError(f"Función desconocida en la medida {nombre}: {funcion}")
+        if funcion != 'cuenta' and columna not in COLUMNAS_MEDIDAS:
+            raise ValueError(f"Columna desconocida en la medida {nombre}: {columna}")
+        if funcion == 'percentil' and (len(medida) < 3 or not 0 <= medida[2] <= 100):
+            raise ValueError(f"La medida {nombre} necesita un percentil entre 0 y 100")
+
+    dimensiones = {dimension for agrupacion in agrupaciones for dimension in agrupacion}
+    codigos = {dimension: codificar_dimension(datos, dimension) for dimension in dimensiones}
+
+    resultados = {}
+    for agrupacion in agrupaciones:
+        agrupacion = tuple(agrupacion)
+
+        # Clave de grupo en base mixta: una cifra por dimensión
+        clave = np.zeros(len(datos), dtype=np.int64)
+        combinaciones = 1
+        for dimension in agrupacion:
+            codigos_dimension, cantidad, _ = codigos[dimension]
+            clave = clave * cantidad + codigos_dimension
+            combinaciones *= cantidad
+
+        if combinaciones > LIMITE_GRUPOS_DENSOS:
+            claves_grupos, clave = np.unique(clave, return_inverse=True)
+            tamano_claves = len(claves_grupos)
+            presentes = slice(None)
+        else:
+            tamano_claves = combinaciones
+            claves_grupos = np.flatnonzero(np.bincount(clave, minlength=tamano_claves))
+            presentes = claves_grupos
+        cuentas = np.bincount(clave, minlength=tamano_claves)[presentes]
+
+        # Etiquetas de cada dimensión, decodificando la clave de atrás para adelante
+        tabla = {}
+        resto = claves_grupos
+        for dimension in reversed(agrupacion):
+            _, cantidad, etiquetar = codigos[dimension]
+            resto, codigo = np.divmod(resto, cantidad)
+            tabla[dimension] = etiquetar(codigo)
+        tabla = {dimension: tabla[dimension] for dimension in agrupacion}
+
+        sumas = {}
+        ordenados = {}
+        inicios = np.cumsum(cuentas) - cuentas
+        for nombre, medida in medidas.items():
+            funcion, columna = medida[0], medida[1]
+            if funcion == 'cuenta':
+                tabla[nombre] = cuentas.copy()
+                continue
+
+            if funcion in ('suma', 'media'):
+                if columna not in sumas:
+                    sumas[columna] = np.bincount(clave, weights=getattr(datos, columna),
+                                                 minlength=tamano_claves)[presentes]
+                tabla[nombre] = sumas[columna] if funcion == 'suma' else sumas[columna] / cuentas
+                continue
+
+            if columna not in ordenados:
+                valores = getattr(datos, columna)
+                orden = np.lexsort((valores, clave))
+                ordenados[columna] = valores[orden]
+            percentil = medida[2] if funcion == 'percentil' else (0 if funcion == 'minimo' else 100)
+            tabla[nombre] = percentiles_por_grupo(ordenados[columna], inicios, cuentas, percentil)
+
+        resultados[agrupacion] = tabla
+    return resultados
+
+
+# --- Modo aproximado: muestreo y sketches ---
+
+# Bytes que se leen por vez en el análisis aproximado
+TAMANO_BLOQUE_APROXIMADO = 16 * 1024 * 1024
+
+# Filas de la muestra uniforme (reservorio) para las estadísticas por fila
+TAMANO_MUESTRA = 20000
+
+# Registros de HyperLogLog = 2 ** HLL_PRECISION (error relativo 1.04 / raíz de eso)
+HLL_PRECISION = 14
+
+# Tamaño del compactor más alto de KLL; el error de rango baja como 1/k
+KLL_K = 400
+
+# Columnas cuyos valores distintos se estiman (las que falten en el CSV se ignoran)
+COLUMNAS_DISTINTAS = ('producto', 'cliente')
+
+PERCENTILES_APROXIMADOS = (1, 5, 25, 50, 75, 95, 99)
+
+# Potencias de 10 exactas para convertir decimales
+POTENCIAS_10 = np.array([float(10 ** exponente) for exponente in range(16)])
+
+# Constantes de FNV-1a y de la mezcla final de splitmix64
+FNV_BASE = np.uint64(0xcbf29ce484222325)
+FNV_PRIMO = np.uint64(0x100000001b3)
+MEZCLA_1 = np.uint64(0xbf58476d1ce4e5b9)
+MEZCLA_2 = np.uint64(0x94d049bb133111eb)
+MASCARA_64 = np.uint64(0xffffffffffffffff)
+
+
+class MuestraReservorio:
+    """
+    Muestra uniforme de 'tamano' elementos de un flujo de largo desconocido
+    (muestreo de reservorio por prioridades): cada elemento recibe una clave
+    al azar y la muestra son los 'tamano' de menor clave. Las claves de cada
+    lote se sortean juntas con NumPy y sólo se piden los elementos con clave
+    menor que la mayor de la muestra: unos tamano * log(vistos / tamano) en
+    total, no todos.
+    """
+
+    def __init__(self, tamano=TAMANO_MUESTRA, semilla=None):
+        self.tamano = tamano
+        self.elementos = []
+        self.claves = np.empty(0)
+        self.vistos = 0
+        self.generador = np.random.default_rng(semilla)
+
+    def agregar_lote(self, cantidad, obtener):
+        """Considera 'cantidad' elementos más; obtener(i) devuelve el i-ésimo del lote."""
+        claves = self.generador.random(cantidad)
+        self.vistos += cantidad
+        if len(self.claves) == self.tamano:
+            candidatos = np.flatnonzero(claves < self.claves.max())
+        else:
+            candidatos = np.arange(cantidad)
+        if len(candidatos) > self.tamano:
+            candidatos = candidatos[np.argpartition(claves[candidatos], self.tamano - 1)[:self.tamano]]
+        if not len(candidatos):
+            return
+
+        claves = np.concatenate((self.claves, claves[candidatos]))
+        elementos = self.elementos + [obtener(indice) for indice in candidatos.tolist()]
+        if len(claves) > self.tamano:
+            quedan = np.argpartition(claves, self.tamano - 1)[:self.tamano]
+            claves = claves[quedan]
+            elementos = [elementos[indice] for indice in quedan.tolist()]
+        self.claves = claves
+        self.elementos = elementos
+
+
+def sigma_hll(x):
+    """Serie sigma del estimador de Ertl para la fracción de registros vacíos."""
+    if x == 1:
+        return math.inf
+    y = 1.0
+    z = x
+    while True:
+        x *= x
+        anterior = z
+        z += x * y
+        y += y
+        if z == anterior:
+            return z
+
+
+def tau_hll(x):
+    """Serie tau del estimador de Ertl para la fracción de registros saturados."""
+    if x == 0 or x == 1:
+        return 0.0
+    y = 1.0
+    z = 1 - x
+    while True:
+        x = math.sqrt(x)
+        anterior = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == anterior:
+            return z / 3
+
+
+class HyperLogLog:
+    """
+    Estimador de la cantidad de valores distintos con memoria fija
+    (2 ** precision bytes). Dos HyperLogLog con la misma precisión se pueden
+    combinar, por ejemplo los de archivos distintos.
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registros = np.zeros(1 << precision, dtype=np.uint8)
+
+    def agregar(self, hashes):
+        """Agrega hashes de 64 bits (ver hash_campos); repetir valores no cambia la estimación."""
+        if not len(hashes):
+            return
+        indices = hashes >> np.uint64(64 - self.precision)
+        # Ceros a la izquierda del resto del hash: con los 53 bits más altos
+        # en un float, frexp da la cantidad de bits exacta
+        resto = hashes << np.uint64(self.precision)
+        bits = np.frexp((resto >> np.uint64(11)).astype(np.float64))[1]
+        rangos = np.minimum(np.where(bits > 0, 54 - bits, 54), 65 - self.precision).astype(np.uint8)
+        np.maximum.at(self.registros, indices, rangos)
+
+    def combinar(self, otro):
+        np.maximum(self.registros, otro.registros, out=self.registros)
+
+    def estimar(self):
+        """
+        Devuelve la cantidad estimada de valores distintos, con el estimador
+        de Ertl (2017) sobre el histograma de los registros: a diferencia del
+        de Flajolet, no tiene sesgo cuando hay pocos valores y no necesita
+        tablas de corrección.
+        """
+        m = len(self.registros)
+        maximo = 64 - self.precision
+        histograma = np.bincount(self.registros, minlength=maximo + 2).tolist()
+        z = m * tau_hll(1 - histograma[maximo + 1] / m)
+        for rango in range(maximo, 0, -1):
+            z = 0.5 * (z + histograma[rango])
+        z += m * sigma_hll(histograma[0] / m)
+        return m * m / (2 * math.log(2) * z)
+
+    def error_relativo(self):
+        """Error estándar relativo de la estimación."""
+        return 1.04 / math.sqrt(len(self.registros))
+
+
+class SketchKLL:
+    """
+    Sketch KLL de cuantiles: resume un flujo de números en unos pocos miles
+    de valores con pesos. Cada nivel guarda valores de peso 2 ** nivel; cuando
+    un nivel se llena se ordena y la mitad de sus valores (los pares o los
+    impares, al azar) sube al nivel siguiente. Se alimenta con arreglos
+    completos y dos sketches se pueden combinar.
+    """
+
+    def __init__(self, k=KLL_K, semilla=None):
+        self.k = k
+        self.niveles = [np.empty(0)]
+        self.cantidad = 0
+        self.aleatorio = random.Random(semilla)
+
+    def _capacidad(self, nivel):
+        profundidad = len(self.niveles) - nivel - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** profundidad))
+
+    def agregar(self, valores):
+        """Agrega un arreglo de valores."""
+        valores = np.asarray(valores, dtype=np.float64)
+        self.cantidad += len(valores)
+        self.niveles[0] = np.concatenate((self.niveles[0], valores))
+        self._compactar()
+
+    def combinar(self, otro):
+        for nivel, valores in enumerate(otro.niveles):
+            if nivel == len(self.niveles):
+                self.niveles.append(np.empty(0))
+            self.niveles[nivel] = np.concatenate((self.niveles[nivel], valores))
+        self.cantidad += otro.cantidad
+        self._compactar()
+
+    def _compactar(self):
+        nivel = 0
+        while nivel < len(self.niveles):
+            valores = self.niveles[nivel]
+            if len(valores) > self._capacidad(nivel):
+                if nivel + 1 == len(self.niveles):
+                    self.niveles.append(np.empty(0))
+                valores = np.sort(valores)
+                # Con una cantidad impar, el mayor se queda en este nivel
+                sobrante = len(valores) % 2
+                self.niveles[nivel] = valores[len(valores) - sobrante:]
+                elegidos = valores[self.aleatorio.randrange(2):len(valores) - sobrante:2]
+                self.niveles[nivel + 1] = np.concatenate((self.niveles[nivel + 1], elegidos))
+            nivel += 1
+
+    def error_rango(self):
+        """
+        Error de rango normalizado con 99 % de confianza (la aproximación que
+        usa Apache DataSketches para KLL): el valor devuelto para el percentil
+        p tiene un rango real entre p - error y p + error.
+        """
+        return 2.296 / self.k ** 0.9723
+
+    def percentiles(self, percentiles):
+        """Devuelve {p: (valor, mínimo, máximo)}, con el intervalo que da error_rango()."""
+        valores = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(datos), 2.0 ** nivel) for nivel, datos in enumerate(self.niveles)])
+        orden = np.argsort(valores, kind='stable')
+        valores = valores[orden]
+        acumulado = np.cumsum(pesos[orden]) / pesos.sum()
+
+        def valor(fraccion):
+            posicion = np.searchsorted(acumulado, min(max(fraccion, 0.0), 1.0))
+            return float(valores[min(posicion, len(valores) - 1)])
+
+        error = self.error_rango()
+        return {
+            percentil: (valor(percentil / 100), valor(percentil / 100 - error), valor(percentil / 100 + error))
+            for percentil in percentiles
+        }
+
+
+def ubicar_campos(bloque, columnas):
+    """
+    Ubica con NumPy los campos de cada línea de un bloque en bytes, buscando
+    saltos de línea y comas de una sola vez. Devuelve (contenido, inicios,
+    finales), con inicios y finales de forma (líneas, columnas), o None si el
+    bloque tiene comillas o líneas con otra cantidad de columnas: entonces hay
+    que separarlo con csv.reader. Las líneas vacías se saltean.
+    """
+    if b'"' in bloque:
+        return None
+    if not bloque.endswith(b'\n'):
+        bloque += b'\n'
+    contenido = np.frombuffer(bloque, dtype=np.uint8)
+    saltos = np.flatnonzero(contenido == ord('\n'))
+    inicios_lineas = np.concatenate(([0], saltos[:-1] + 1))
+    finales_lineas = saltos - (contenido[saltos - 1] == ord('\r'))
+    no_vacias = finales_lineas > inicios_lineas
+    inicios_lineas = inicios_lineas[no_vacias]
+    finales_lineas = finales_lineas[no_vacias]
+
+    # Con la cantidad justa de comas, y la primera y la última coma de cada
+    # grupo dentro de su línea, cada línea tiene exactamente columnas - 1
+    comas = np.flatnonzero(contenido == ord(','))
+    lineas = len(inicios_lineas)
+    if len(comas) != lineas * (columnas - 1):
+        return None
+    comas = comas.reshape(lineas, columnas - 1)
+    if columnas > 1 and ((comas[:, 0] < inicios_lineas).any() or (comas[:, -1] >= finales_lineas).any()):
+        return None
+
+    inicios = np.empty((lineas, columnas), dtype=np.int64)
+    finales = np.empty((lineas, columnas), dtype=np.int64)
+    inicios[:, 0] = inicios_lineas
+    inicios[:, 1:] = comas + 1
+    finales[:, :-1] = comas
+    finales[:, -1] = finales_lineas
+    return contenido, inicios, finales
+
+
+def convertir_numeros(contenido, inicios, finales, decimales=True):
+    """
+    Convierte campos numéricos sin signo ('12', '899.99') a float64 con NumPy,
+    posición por posición de los campos. El resultado es idéntico a float():
+    la mantisa entera y la potencia de 10 son exactas y la división redondea
+    una sola vez. Devuelve None si algún campo tiene otro formato (o punto,
+    si 'decimales' es False).
+    """
+    largos = finales - inicios
+    ancho = int(largos.max(initial=0))
+    if ancho > 15 or (largos == 0).any():
+        return None
+    ultimo = len(contenido) - 1
+    mantisas = np.zeros(len(largos), dtype=np.int64)
+    puntos = np.zeros(len(largos), dtype=np.int64)
+    posicion_punto = largos - 1
+    for posicion in range(ancho):
+        activos = largos > posicion
+        caracteres = contenido[np.minimum(inicios + posicion, ultimo)]
+        digitos = caracteres - np.uint8(ord('0'))
+        es_punto = activos & (caracteres == ord('.'))
+        es_digito = activos & (digitos < 10)
+        if (activos & ~es_punto & ~es_digito).any():
+            return None
+        puntos += es_punto
+        posicion_punto = np.where(es_punto, posicion, posicion_punto)
+        mantisas = np.where(es_digito, mantisas * 10 + digitos, mantisas)
+    if (puntos > (1 if decimales else 0)).any() or (largos == puntos).any():
+        return None
+    return mantisas / POTENCIAS_10[largos - 1 - posicion_punto]
+
+
+def hash_campos(contenido, inicios, finales):
+    """
+    Hash de 64 bits de cada campo, leyendo de a 8 bytes: cada palabra se
+    combina como en FNV-1a y al final se aplica la mezcla de splitmix64.
+    """
+    largos = finales - inicios
+    relleno = np.concatenate((contenido, np.zeros(8, dtype=np.uint8)))
+    # Una palabra de 8 bytes por cada posición del contenido (lecturas sin alinear)
+    palabras = np.ndarray((len(contenido),), dtype=np.uint64, buffer=relleno, strides=(1,))
+    hashes = np.full(len(largos), FNV_BASE, dtype=np.uint64)
+    for desplazamiento in range(0, int(largos.max(initial=0)), 8):
+        restantes = np.clip(largos - desplazamiento, 0, 8).astype(np.uint64)
+        mascaras = np.where(restantes == 8, MASCARA_64, (np.uint64(1) << (restantes * np.uint64(8))) - np.uint64(1))
+        palabra = palabras[np.minimum(inicios + desplazamiento, len(contenido) - 1)] & mascaras
+        mezcla = (hashes ^ palabra) * FNV_PRIMO
+        hashes = np.where(restantes > 0, mezcla ^ (mezcla >> np.uint64(32)), hashes)
+    hashes ^= largos.astype(np.uint64)
+    hashes ^= hashes >> np.uint64(30)
+    hashes *= MEZCLA_1
+    hashes ^= hashes >> np.uint64(27)
+    hashes *= MEZCLA_2
+    hashes ^= hashes >> np.uint64(31)
+    return hashes
+
+
+def hash_textos(textos):
+    """hash_campos() para una lista de textos (los mismos hashes que para esos bytes en el CSV)."""
+    codificados = [texto.encode('utf-8') for texto in textos]
+    largos = np.fromiter(map(len, codificados), np.int64, len(codificados))
+    finales = np.cumsum(largos)
+    contenido = np.frombuffer(b''.join(codificados) or b'\0', dtype=np.uint8)
+    return hash_campos(contenido, finales - largos, finales)
+
+
+def resumir_bloque(bloque, columnas, indices, distintas):
+    """
+    Extrae de un bloque del CSV sólo lo que necesita el análisis aproximado,
+    sin convertir filas enteras. Devuelve (filas, obtener, cantidades,
+    precios, hashes, descartadas): obtener(i) da la fila i sin separar (ver
+    fila_muestra) para la muestra, hashes tiene los de cada columna de
+    'distintas' ({columna: posición}) y descartadas cuenta las filas con otra
+    cantidad de columnas, que no entran en el análisis.
+    """
+    posiciones_esquema = tuple(indices.values())
+    campos = ubicar_campos(bloque, columnas)
+    if campos is not None:
+        contenido, inicios, finales = campos
+        cantidades = convertir_numeros(contenido, inicios[:, indices['cantidad']], finales[:, indices['cantidad']],
+                                       decimales=False)
+        precios = convertir_numeros(contenido, inicios[:, indices['precio']], finales[:, indices['precio']])
+        if cantidades is not None and precios is not None:
+            def obtener(fila):
+                return bloque[inicios[fila, 0]:finales[fila, -1]], posiciones_esquema
+
+            hashes = {columna: hash_campos(contenido, inicios[:, posicion], finales[:, posicion])
+                      for columna, posicion in distintas.items()}
+            return len(inicios), obtener, cantidades.astype(np.int64), precios, hashes, 0
+
+    # Bloques con comillas o formatos raros: csv.reader y conversión en Python
+    filas = []
+    descartadas = 0
+    for fila in csv.reader(io.StringIO(bloque.decode('utf-8'), newline='')):
+        if len(fila) == columnas:
+            filas.append(fila)
+        elif fila:
+            descartadas += 1
+    cantidades = np.fromiter(map(int, map(itemgetter(indices['cantidad']), filas)), np.int64, len(filas))
+    precios = np.fromiter(map(float, map(itemgetter(indices['precio']), filas)), np.float64, len(filas))
+    hashes = {columna: hash_textos(list(map(itemgetter(posicion), filas))) for columna, posicion in distintas.items()}
+    return len(filas), lambda fila: (filas[fila], posiciones_esquema), cantidades, precios, hashes, descartadas
+
+
+def fila_muestra(elemento):
+    """Convierte un elemento de la muestra en la fila con las columnas del esquema, en su orden."""
+    fila, posiciones = elemento
+    if isinstance(fila, bytes):
+        # Las líneas de bloques sin comillas se separan con split
+        fila = fila.decode('utf-8').split(',')
+    return [fila[posicion] for posicion in posiciones]
+
+
+def estimar_totales(valores, codigos, cantidad_codigos, filas, z):
+    """
+    Estima la suma de 'valores' por código en toda la población a partir de
+    una muestra uniforme: N * media, con un intervalo normal de semiancho
+    z * N * desvío / raíz(n), corregido por población finita. Devuelve
+    (estimaciones, errores).
+    """
+    muestra = len(valores)
+    medias = np.bincount(codigos, weights=valores, minlength=cantidad_codigos) / muestra
+    cuadrados = np.bincount(codigos, weights=valores * valores, minlength=cantidad_codigos) / muestra
+    varianzas = np.maximum(cuadrados - medias * medias, 0) * muestra / max(muestra - 1, 1)
+    correccion = math.sqrt(max(1 - muestra / filas, 0))
+    return filas * medias, z * filas * np.sqrt(varianzas / muestra) * correccion
+
+
+def estimar_ventas(ruta_archivo, tamano_muestra=TAMANO_MUESTRA, confianza=0.95, percentiles=PERCENTILES_APROXIMADOS,
+                   precision=HLL_PRECISION, k=KLL_K, semilla=None):
+    """
+    Estadísticas aproximadas de uno o varios CSV en una sola pasada liviana:
+    las líneas se separan y las columnas necesarias se convierten con NumPy
+    sobre los bytes; fechas y nombres sólo se convierten para la muestra.
+
+    - Una muestra uniforme de 'tamano_muestra' filas (MuestraReservorio) da
+      los totales, las medias, los productos top y las ventas por mes y
+      categoría, con intervalos del nivel de 'confianza'.
+    - HyperLogLog estima los productos distintos (y los clientes, si el CSV
+      tiene la columna 'cliente').
+    - Sketches KLL de precio, cantidad y total de todas las filas dan los
+      percentiles; su intervalo es el del error de rango (99 %).
+
+    Cada estimación es (valor, error): el valor real está en valor ± error
+    con la confianza indicada. Los percentiles son {p: (valor, mínimo, máximo)}.
+    Las filas con otra cantidad de columnas que el encabezado no se analizan:
+    se cuentan en 'filas_descartadas'. Devuelve None si no hay filas.
+    """
+    z = NormalDist().inv_cdf((1 + confianza) / 2)
+    muestra = MuestraReservorio(tamano_muestra, semilla)
+    distintos = {}
+    sketches = {columna: SketchKLL(k, semilla) for columna in COLUMNAS_MEDIDAS}
+    descartadas = 0
+
+    for ruta in resolver_rutas(ruta_archivo):
+        with open(ruta, 'rb') as archivo:
+            encabezado = next(csv.reader([archivo.readline().decode('utf-8')]), None)
+            if not encabezado:
+                continue
+            indices = indices_esquema(encabezado)
+            posiciones = {nombre.strip(): indice for indice, nombre in enumerate(encabezado)}
+            distintas = {columna: posiciones[columna] for columna in COLUMNAS_DISTINTAS if columna in posiciones}
+            for columna in distintas:
+                distintos.setdefault(columna, HyperLogLog(precision))
+
+            for bloque in leer_bloques_lineas(archivo, TAMANO_BLOQUE_APROXIMADO):
+                filas, obtener, cantidades, precios, hashes, descartadas_bloque = resumir_bloque(
+                    bloque, len(encabezado), indices, distintas)
+                descartadas += descartadas_bloque
+                muestra.agregar_lote(filas, obtener)
+                for columna, valores in hashes.items():
+                    distintos[columna].agregar(valores)
+                sketches['cantidad'].agregar(cantidades)
+                sketches['precio'].agregar(precios)
+                sketches['total'].agregar(cantidades * precios)
+
+    filas = muestra.vistos
+    if not filas:
+        return None
+
+    # La muestra tiene las columnas en el orden del esquema
+    indices_muestra = {columna: indice for indice, columna in enumerate(ESQUEMA_VENTAS)}
+    codificadores = {'producto': Codificador(), 'categoria': Codificador()}
+    datos = convertir_filas(list(map(fila_muestra, muestra.elementos)), indices_muestra, CacheFechas(), codificadores)
+    ceros = np.zeros(len(datos), dtype=np.int64)
+
+    def total(valores):
+        estimacion, error = estimar_totales(valores.astype(np.float64), ceros, 1, filas, z)
+        return float(estimacion[0]), float(error[0])
+
+    def media(valores):
+        estimacion, error = total(valores)
+        return estimacion / filas, error / filas
+
+    def por_codigo(codigos, valores, nombres, limite=None):
+        estimaciones, errores = estimar_totales(valores.astype(np.float64), codigos, len(nombres), filas, z)
+        orden = np.argsort(-estimaciones, kind='stable')[:limite]
+        return [(nombres[codigo], float(estimaciones[codigo]), float(errores[codigo])) for codigo in orden.tolist()]
+
+    meses, codigos_meses = np.unique(datos.fecha.astype('datetime64[M]'), return_inverse=True)
+    estadisticas = {
+        'filas': filas,
+        'muestra': len(datos),
+        'filas_descartadas': descartadas,
+        'confianza': confianza,
+        'total_ventas': total(datos.total),
+        'cantidad_total': total(datos.cantidad),
+        'media_precio': media(datos.precio),
+        'media_cantidad': media(datos.cantidad),
+        'media_total': media(datos.total),
+        'productos_top': por_codigo(datos.producto, datos.cantidad, datos.productos, TOP_PRODUCTOS),
+        'meses_top': por_codigo(codigos_meses, datos.total, np.datetime_as_string(meses, unit='M').tolist()),
+        'categorias': por_codigo(datos.categoria, datos.total, datos.categorias),
+        'percentiles': {columna: sketch.percentiles(percentiles) for columna, sketch in sketches.items()},
+        'error_rango_percentiles': sketches['precio'].error_rango()
+    }
+    for columna, hll in distintos.items():
+        estimacion = hll.estimar()
+        estadisticas[f'{columna}s_distintos'] = (estimacion, z * hll.error_relativo() * estimacion)
+    return estadisticas
+
+
+# --- Informe HTML ---
+
+FILAS_POR_PAGINA_HTML = 1000
+
+INICIO_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Informe de Ventas</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        h1 { color: #2c3e50; }
+        h2 { color: #3498db; margin-top: 20px; }
+        table { border-collapse: collapse; width: 100%; margin-bottom: 20px; }
+        th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+        th { background-color: #f2f2f2; }
+        tr:nth-child(even) { background-color: #f9f9f9; }
+        summary { cursor: pointer; color: #3498db; margin: 8px 0; }
+    </style>
+</head>
+<body>
+    <h1>Informe de Ventas</h1>
+"""
+
+FIN_HTML = """</body>
+</html>
+"""
+
+PLANTILLA_TITULO_HTML = """
+    <h2>{}</h2>
+"""
+
+PLANTILLA_TABLA_HTML = """    <table>
+        <tr><th>{}</th><th>{}</th></tr>
+"""
+
+PLANTILLA_FILA_HTML = """        <tr><td>{}</td><td>{}</td></tr>
+"""
+
+PLANTILLA_PAGINA_HTML = """    <details{}>
+        <summary>Página {} (desde la fila {})</summary>
+"""
+
+FIN_TABLA_HTML = """    </table>
+"""
+
+FIN_PAGINA_HTML = """    </details>
+"""
+
+
+def generar_tabla_html(titulo, encabezados, filas, filas_por_pagina=FILAS_POR_PAGINA_HTML):
+    """
+    Genera el HTML de una sección (título y tabla) de a una fila. Si hay más
+    de 'filas_por_pagina' filas, la tabla se parte en páginas plegables
+    (<details>) y sólo la primera queda abierta.
+    """
+    yield PLANTILLA_TITULO_HTML.format(escape(titulo, quote=False))
+    inicio_tabla = PLANTILLA_TABLA_HTML.format(*encabezados)
+    fila_html = PLANTILLA_FILA_HTML.format
+
+    # Se mira si hay más de una página sin leer más que la primera
+    filas = iter(filas)
+    primera_pagina = list(islice(filas, filas_por_pagina))
+    siguiente = next(filas, None)
+    if siguiente is None:
+        yield inicio_tabla
+        for fila in primera_pagina:
+            yield fila_html(*fila)
+        yield FIN_TABLA_HTML
+        return
+
+    for indice, fila in enumerate(chain(primera_pagina, [siguiente], filas)):
+        if indice % filas_por_pagina == 0:
+            if indice:
+                yield FIN_TABLA_HTML + FIN_PAGINA_HTML
+            yield PLANTILLA_PAGINA_HTML.format(' open' if indice == 0 else '', indice // filas_por_pagina + 1,
+                                               indice + 1)
+            yield inicio_tabla
+        yield fila_html(*fila)
+    yield FIN_TABLA_HTML + FIN_PAGINA_HTML
+
+
+@lru_cache(maxsize=None)
+def formatear_mes(mes, formato='%B %Y'):
+    """Convierte una clave 'YYYY-MM' en texto ('January 2023'), sin strptime."""
+    anio, numero = mes.split('-')
+    return datetime(int(anio), int(numero), 1).strftime(formato)
+
+
+# --- Gráficos ---
+# matplotlib se importa recién al dibujar, así las ejecuciones que sólo generan
+# informes CSV o HTML no pagan su importación. Se usa la API orientada a objetos
+# (Figure con el backend Agg), sin el estado global de pyplot, para poder
+# dibujar cada gráfico en un proceso distinto.
+
+# Hashes de los datos de cada gráfico, en el directorio de salida
+GRAFICOS_HASHES = 'graficos.json'
+
+
+def nueva_figura(tamano):
+    """Crea una figura de matplotlib con el backend Agg (sin pyplot)."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figura = Figure(figsize=tamano)
+    FigureCanvasAgg(figura)
+    return figura
+
+
+def rotar_etiquetas_x(eje):
+    """Rota las etiquetas del eje x 45 grados, alineadas a la derecha."""
+    for etiqueta in eje.get_xticklabels():
+        etiqueta.set_rotation(45)
+        etiqueta.set_horizontalalignment('right')
+
+
+def graficar_productos_top(ruta_salida, productos, cantidades):
+    """Gráfico de barras de los productos más vendidos."""
+    figura = nueva_figura((10, 6))
+    eje = figura.add_subplot()
+    eje.bar(productos, cantidades, color='skyblue')
+    eje.set_title('Productos más vendidos')
+    eje.set_xlabel('Producto')
+    eje.set_ylabel('Cantidad')
+    rotar_etiquetas_x(eje)
+    figura.tight_layout()
+    figura.savefig(ruta_salida)
+
+
+def graficar_ventas_por_mes(ruta_salida, meses, ventas):
+    """Gráfico de líneas de las ventas por mes."""
+    figura = nueva_figura((12, 6))
+    eje = figura.add_subplot()
+    eje.plot(meses, ventas, marker='o', linestyle='-', color='green')
+    eje.set_title('Ventas por Mes')
+    eje.set_xlabel('Mes')
+    eje.set_ylabel('Ventas ($)')
+    rotar_etiquetas_x(eje)
+    eje.grid(True, linestyle='--', alpha=0.7)
+    figura.tight_layout()
+    figura.savefig(ruta_salida)
+
+
+def graficar_ventas_por_categoria(ruta_salida, categorias, ventas):
+    """Gráfico de torta con la distribución de ventas por categoría."""
+    figura = nueva_figura((10, 7))
+    eje = figura.add_subplot()
+    eje.pie(ventas, labels=categorias, autopct='%1.1f%%', startangle=140, shadow=True)
+    eje.set_title('Distribución de Ventas por Categoría')
+    eje.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
+    figura.tight_layout()
+    figura.savefig(ruta_salida)
+
+
+def hash_grafico(funcion, datos):
+    """Hash de los datos de un gráfico (y de qué función lo dibuja)."""
+    contenido = json.dumps([funcion.__name__, datos], ensure_ascii=False)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
 
 
 class ProcesadorVentas:
     """Clase para procesar datos de ventas desde archivos CSV"""
 
-    def __init__(self, ruta_archivo):
-        """Inicializa el procesador con la ruta del archivo CSV"""
+    def __init__(self, ruta_archivo, usar_cache=True):
+        """
+        Inicializa el procesador con la ruta del archivo CSV. También acepta
+        una lista de rutas o un patrón glob ('ventas/*.csv'); en ese caso los
+        informes combinan todos los archivos.
+
+        usar_cache: cargar_datos() guarda los datos convertidos junto a cada
+        CSV ('ventas.csv.cache') y en las siguientes ejecuciones los carga de
+        ahí mientras el CSV no cambie.
+        """
         self.ruta_archivo = ruta_archivo
+        self.usar_cache = usar_cache
         self.datos = []
         self.productos = defaultdict(int)
         self.ventas_por_mes = defaultdict(float)
         self.ventas_por_categoria = defaultdict(float)
+        self.agregados = None
+        self.estados_incrementales = None
+        self._estadisticas = None
 
     def cargar_datos(self):
-        """Carga los datos desde el archivo CSV"""
+        """Carga los datos desde el archivo CSV en formato columnar (DatosVentas)."""
         try:
-            with open(self.ruta_archivo, 'r', newline='', encoding='utf-8') as archivo_csv:
-                lector = csv.DictReader(archivo_csv)
-                for fila in lector:
-                    # Convertir tipo de datos
-                    fila['cantidad'] = int(fila['cantidad'])
-                    fila['precio'] = float(fila['precio'])
-                    fila['fecha'] = datetime.strptime(fila['fecha'], '%Y-%m-%d')
-
-                    # Calcular el total de las ventas
-                    fila['total'] = fila['cantidad'] * fila['precio']
-
-                    self.datos.append(fila)
+            bloques = []
+            for ruta in resolver_rutas(self.ruta_archivo):
+                datos = cargar_ventas(ruta, self.usar_cache)
+                if datos is not None:
+                    bloques.append(datos)
+
+            if len(bloques) > 1:
+                # Cada archivo tiene sus propios códigos: se unifican antes de unirlos
+                bloques = list(recodificar_datos(bloques))
+            self.datos = concatenar_datos(bloques) if bloques else []
+            self.agregados = None
+            self._estadisticas = None
             return True
         except Exception as e:
             print(f"Error al cargar los datos: {e}")
@@ -53,40 +1522,168 @@ class ProcesadorVentas:
         if not self.datos:
             return False
 
-        # Reiniciar contadores
-        self.productos = defaultdict(int)
-        self.ventas_por_mes = defaultdict(float)
-        self.ventas_por_categoria = defaultdict(float)
+        agregados = AgregadosVentas()
+        agregados.agregar_datos(self.datos)
+        self._usar_agregados(agregados)
+        return True
 
-        # Procesar cada venta
-        for venta in self.datos:
-            # Contar productos vendidos
-            self.productos[venta['producto']] += venta['cantidad']
+    def procesar_por_bloques(self, tamano_bloque=TAMANO_BLOQUE_VENTAS, procesos=1):
+        """
+        Analiza el CSV en bloques de 'tamano_bloque' filas sin cargarlo entero:
+        cada bloque se suma a los agregados y se descarta, así que la memoria
+        depende del tamaño del bloque y no del archivo. Los informes quedan
+        iguales a los de cargar_datos() + analizar_datos().
 
-            # Sumar ventas por mes
-            mes_clave = venta['fecha'].strftime('%Y-%m')
-            self.ventas_por_mes[mes_clave] += venta['total']
+        procesos: con varios archivos, cuántos procesar a la vez (None usa
+        todos los núcleos). Cada proceso devuelve los agregados de su archivo
+        y se combinan en el orden de los archivos, así que el resultado no
+        depende de la cantidad de procesos.
+        """
+        if procesos is None:
+            procesos = os.cpu_count() or 1
 
-            # Sumar ventas por categoría
-            self.ventas_por_categoria[venta['categoria']] += venta['total']
+        try:
+            rutas = resolver_rutas(self.ruta_archivo)
+            if procesos > 1 and len(rutas) > 1:
+                with ProcessPoolExecutor(max_workers=min(procesos, len(rutas))) as executor:
+                    parciales = executor.map(agregar_archivo, rutas, [tamano_bloque] * len(rutas))
+                    agregados = AgregadosVentas()
+                    for parcial in parciales:
+                        agregados.combinar(parcial)
+            else:
+                agregados = AgregadosVentas()
+                for ruta in rutas:
+                    agregados.combinar(agregar_archivo(ruta, tamano_bloque))
+            self.datos = []
+            self._usar_agregados(agregados)
+            return True
+        except Exception as e:
+            print(f"Error al procesar los datos: {e}")
+            return False
 
-        return True
+    def actualizar_datos(self, ruta_checkpoint=None):
+        """
+        Análisis incremental para CSV a los que sólo se agregan filas. La primera
+        vez se procesa todo; después, sólo las filas agregadas desde la llamada
+        anterior, sumándolas a los agregados que ya se tenían. Así el costo de
+        refrescar los informes depende de lo nuevo y no de todo el historial.
 
-    def obtener_estadisticas(self):
-        """Devuelve un diccionario con estadísticas de ventas."""
+        Por cada archivo se recuerda la posición en bytes y sus agregados. Con
+        ruta_checkpoint ese estado también se guarda en JSON, para continuar
+        entre ejecuciones. Un archivo reemplazado o truncado se vuelve a
+        procesar desde el principio (ver actualizar_archivo).
+        """
+        try:
+            if self.estados_incrementales is None:
+                self.estados_incrementales = cargar_estado_incremental(ruta_checkpoint) if ruta_checkpoint else {}
+
+            estados = {}
+            for ruta in resolver_rutas(self.ruta_archivo):
+                estado = actualizar_archivo(ruta, self.estados_incrementales.get(ruta))
+                if estado is not None:
+                    estados[ruta] = estado
+            self.estados_incrementales = estados
+
+            if ruta_checkpoint:
+                guardar_estado_incremental(ruta_checkpoint, estados)
+
+            if len(estados) == 1:
+                agregados = next(iter(estados.values()))['agregados']
+            else:
+                agregados = AgregadosVentas()
+                for estado in estados.values():
+                    agregados.combinar(estado['agregados'])
+            self.datos = []
+            self._usar_agregados(agregados)
+            return True
+        except Exception as e:
+            print(f"Error al actualizar los datos: {e}")
+            return False
+
+    def agrupar(self, agrupaciones, medidas):
+        """
+        Agrupa las ventas cargadas por cualquier combinación de dimensiones
+        (producto, categoria, dia, semana, mes, anio) con sumas, cuentas,
+        medias, mínimos, máximos o percentiles. Todas las agrupaciones se
+        calculan juntas; ver agrupar_datos() para el formato.
+
+        Ejemplo:
+            procesador.agrupar(
+                [('producto', 'mes'), ('categoria', 'semana')],
+                {'ventas': ('suma', 'total'), 'p50_precio': ('percentil', 'precio', 50)}
+            )
+
+        Requiere cargar_datos(); devuelve None si no hay datos.
+        """
         if not self.datos:
             return None
+        return agrupar_datos(self.datos, agrupaciones, medidas)
 
-        # Calcular estadísticas generales
-        total_ventas = sum(venta['total'] for venta in self.datos)
-        cantidad_total = sum(venta['cantidad'] for venta in self.datos)
+    def pivotar(self, filas, columnas, medida=('suma', 'total'), relleno=0.0):
+        """
+        Tabla dinámica de dos dimensiones (por ejemplo filas='producto',
+        columnas='mes'). Devuelve (etiquetas_filas, etiquetas_columnas, matriz),
+        con las etiquetas ordenadas y 'relleno' en las celdas sin ventas.
+        """
+        tablas = self.agrupar([(filas, columnas)], {'valor': medida})
+        if tablas is None:
+            return None
+        tabla = tablas[(filas, columnas)]
+        etiquetas_filas, indices_filas = np.unique(np.array(tabla[filas], dtype=object), return_inverse=True)
+        etiquetas_columnas, indices_columnas = np.unique(np.array(tabla[columnas], dtype=object), return_inverse=True)
+        matriz = np.full((len(etiquetas_filas), len(etiquetas_columnas)), relleno, dtype=np.float64)
+        matriz[indices_filas, indices_columnas] = tabla['valor']
+        return etiquetas_filas.tolist(), etiquetas_columnas.tolist(), matriz
 
-        # Productos más vendidos
-        productos_ordenados = sorted(
-            self.productos.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
+    def analizar_aproximado(self, tamano_muestra=TAMANO_MUESTRA, confianza=0.95, semilla=None):
+        """
+        Estadísticas aproximadas para tableros exploratorios sobre archivos
+        enormes, en una fracción del tiempo de cargarlos: totales, medias y
+        rankings de una muestra uniforme, productos distintos con HyperLogLog y
+        percentiles con sketches KLL, cada uno con su margen de error (ver
+        estimar_ventas()). No toca los datos ni los agregados del procesador.
+        Devuelve None si no hay filas o si hubo un error.
+        """
+        try:
+            estadisticas = estimar_ventas(self.ruta_archivo, tamano_muestra, confianza, semilla=semilla)
+        except Exception as e:
+            print(f"Error al estimar las estadísticas: {e}")
+            return None
+        if estadisticas and estadisticas['filas_descartadas']:
+            print(f"Advertencia: se descartaron {estadisticas['filas_descartadas']} filas "
+                  f"con una cantidad de columnas distinta a la del encabezado")
+        return estadisticas
+
+    def _usar_agregados(self, agregados):
+        """Publica los agregados en los atributos que usan los informes."""
+        self.agregados = agregados
+        self._estadisticas = None
+        self.productos = agregados.productos
+        # Meses en orden cronológico, sin importar en qué bloque aparecieron
+        self.ventas_por_mes = defaultdict(float, sorted(agregados.ventas_por_mes.items()))
+        self.ventas_por_categoria = agregados.ventas_por_categoria
+
+    def obtener_estadisticas(self):
+        """
+        Devuelve un diccionario con estadísticas de ventas.
+
+        El resultado se calcula una sola vez y se reutiliza (los informes y los
+        gráficos lo piden cada uno) hasta que cambian los datos. No hay que
+        modificar el diccionario devuelto.
+        """
+        if self.agregados is None and self.datos:
+            self.analizar_datos()
+        if self.agregados is None or not self.agregados.filas:
+            return None
+        if self._estadisticas is not None:
+            return self._estadisticas
+
+        # Estadísticas generales, acumuladas al agregar los datos
+        total_ventas = self.agregados.total_ventas
+        cantidad_total = self.agregados.cantidad_total
+
+        # Productos más vendidos: con un montículo, sin ordenar todos los productos
+        productos_top = heapq.nlargest(TOP_PRODUCTOS, self.productos.items(), key=itemgetter(1))
 
         # Meses con más ventas
         meses_ordenados = sorted(
@@ -102,13 +1699,14 @@ class ProcesadorVentas:
             reverse=True
         )
 
-        return {
+        self._estadisticas = {
             'total_ventas': total_ventas,
             'cantidad_total': cantidad_total,
-            'productos_top': productos_ordenados[:5],
+            'productos_top': productos_top,
             'meses_top': meses_ordenados,
             'categorias': categorias_ordenadas
         }
+        return self._estadisticas
 
     def generar_informe_csv(self, ruta_salida):
         """Genera un informe CSV con las estadísticas."""
@@ -141,8 +1739,7 @@ class ProcesadorVentas:
                 escritor.writerow(['Ventas por mes', '', ''])
                 escritor.writerow(['Mes', 'Ventas ($)', ''])
                 for mes, ventas in estadisticas['meses_top']:
-                    mes_formateado = datetime.strptime(mes, '%Y-%m').strftime('%B %Y')
-                    escritor.writerow([mes_formateado, f"{ventas:.2f}", ''])
+                    escritor.writerow([formatear_mes(mes), f"{ventas:.2f}", ''])
                 escritor.writerow(['', '', ''])
 
                 # Ventas por categoría
@@ -156,163 +1753,126 @@ class ProcesadorVentas:
             print(f"ERROR al generar el informe de CSV: {e}")
             return False
 
-    def generar_informe_html(self, ruta_salida):
-        """Genera un informe HTML con las estadísticas."""
+    def generar_informe_html(self, ruta_salida, todos_los_productos=False,
+                             filas_por_pagina=FILAS_POR_PAGINA_HTML):
+        """
+        Genera un informe HTML con las estadísticas.
+
+        El documento se escribe en el archivo a medida que se genera, fila por
+        fila, así que la memoria no depende de la cantidad de filas. Las tablas
+        de más de 'filas_por_pagina' filas se parten en páginas plegables.
+        Con todos_los_productos se agrega el ranking completo de productos.
+        """
         estadisticas = self.obtener_estadisticas()
         if not estadisticas:
             return False
 
         try:
             with open(ruta_salida, 'w', encoding='utf-8') as archivo_html:
-                html = f"""
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <title>Informe de Ventas</title>
-                    <style>
-                        body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                        h1 {{ color: #2c3e50; }}
-                        h2 {{ color: #3498db; margin-top: 20px; }}
-                        table {{ border-collapse: collapse; width: 100%; margin-bottom: 20px; }}
-                        th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-                        th {{ background-color: #f2f2f2; }}
-                        tr:nth-child(even) {{ background-color: #f9f9f9; }}
-                    </style>
-                </head>
-                <body>
-                    <h1>Informe de Ventas</h1>
-
-                    <h2>Estadísticas Generales</h2>
-                    <table>
-                        <tr>
-                            <th>Métrica</th>
-                            <th>Valor</th>
-                        </tr>
-                        <tr>
-                            <td>Total de ventas ($)</td>
-                            <td>{estadisticas['total_ventas']:.2f}</td>
-                        </tr>
-                        <tr>
-                            <td>Cantidad de productos vendidos</td>
-                            <td>{estadisticas['cantidad_total']}</td>
-                        </tr>
-                    </table>
-
-                    <h2>Productos más vendidos</h2>
-                    <table>
-                        <tr>
-                            <th>Producto</th>
-                            <th>Cantidad</th>
-                        </tr>
-                """
+                archivo_html.writelines(self._partes_html(estadisticas, todos_los_productos, filas_por_pagina))
+            return True
+        except Exception as e:
+            print(f"Error al generar el informe HTML: {e}")
+            return False
 
-                for producto, cantidad in estadisticas['productos_top']:
-                    html += f"""
-                        <tr>
-                            <td>{producto}</td>
-                            <td>{cantidad}</td>
-                        </tr>
-                    """
-
-                html += """
-                    </table>
-
-                    <h2>Ventas por mes</h2>
-                    <table>
-                        <tr>
-                            <th>Mes</th>
-                            <th>Ventas ($)</th>
-                        </tr>
-                """
+    def _partes_html(self, estadisticas, todos_los_productos, filas_por_pagina):
+        """Genera el informe HTML de a partes, para escribirlo sin armarlo entero en memoria."""
+        yield INICIO_HTML
 
-                for mes, ventas in estadisticas['meses_top']:
-                    mes_formateado = datetime.strptime(mes, '%Y-%m').strftime('%B %Y')
-                    html += f"""
-                        <tr>
-                            <td>{mes_formateado}</td>
-                            <td>{ventas:.2f}</td>
-                        </tr>
-                    """
-
-                html += """
-                    </table>
-
-                    <h2>Ventas por categoría</h2>
-                    <table>
-                        <tr>
-                            <th>Categoría</th>
-                            <th>Ventas ($)</th>
-                        </tr>
-                """
+        yield from generar_tabla_html('Estadísticas Generales', ('Métrica', 'Valor'), [
+            ('Total de ventas ($)', f"{estadisticas['total_ventas']:.2f}"),
+            ('Cantidad de productos vendidos', estadisticas['cantidad_total'])
+        ], filas_por_pagina)
 
-                for categoria, ventas in estadisticas['categorias']:
-                    html += f"""
-                        <tr>
-                            <td>{categoria}</td>
-                            <td>{ventas:.2f}</td>
-                        </tr>
-                    """
+        yield from generar_tabla_html('Productos más vendidos', ('Producto', 'Cantidad'), (
+            (escape(producto, quote=False), cantidad)
+            for producto, cantidad in estadisticas['productos_top']
+        ), filas_por_pagina)
 
-                html += """
-                    </table>
-                </body>
-                </html>
-                """
+        yield from generar_tabla_html('Ventas por mes', ('Mes', 'Ventas ($)'), (
+            (formatear_mes(mes), f"{ventas:.2f}")
+            for mes, ventas in estadisticas['meses_top']
+        ), filas_por_pagina)
 
-                archivo_html.write(html)
+        yield from generar_tabla_html('Ventas por categoría', ('Categoría', 'Ventas ($)'), (
+            (escape(categoria, quote=False), f"{ventas:.2f}")
+            for categoria, ventas in estadisticas['categorias']
+        ), filas_por_pagina)
 
-            return True
-        except Exception as e:
-            print(f"Error al generar el informe HTML: {e}")
-            return False
+        if todos_los_productos:
+            ranking = sorted(self.productos.items(), key=itemgetter(1), reverse=True)
+            yield from generar_tabla_html('Todos los productos', ('Producto', 'Cantidad'), (
+                (escape(producto, quote=False), cantidad)
+                for producto, cantidad in ranking
+            ), filas_por_pagina)
 
-    def generar_graficos(self, directorio_salida):
-        """Genera gráficos de visualización de las estadísticas."""
+        yield FIN_HTML
+
+    def generar_graficos(self, directorio_salida, procesos=1):
+        """
+        Genera gráficos de visualización de las estadísticas.
+
+        Por defecto se dibujan en este proceso: son pocos y chicos, y levantar
+        procesos cuesta más que dibujarlos. Con procesos > 1 (None usa todos
+        los núcleos) cada gráfico pendiente se dibuja en su propio proceso.
+        Un gráfico cuyos datos no cambiaron desde la última vez que se
+        escribió su PNG no se vuelve a dibujar: el hash de sus datos se
+        guarda en GRAFICOS_HASHES.
+        """
         estadisticas = self.obtener_estadisticas()
         if not estadisticas or not os.path.exists(directorio_salida):
             return False
 
+        if procesos is None:
+            procesos = os.cpu_count() or 1
+
         try:
-            # Gráfico de productos más vendidos
-            productos = [p[0] for p in estadisticas['productos_top'][:5]]
-            cantidades = [p[1] for p in estadisticas['productos_top'][:5]]
-
-            plt.figure(figsize=(10, 6))
-            plt.bar(productos, cantidades, color='skyblue')
-            plt.title('Productos más vendidos')
-            plt.xlabel('Producto')
-            plt.ylabel('Cantidad')
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            plt.savefig(os.path.join(directorio_salida, 'productos_top.png'))
-            plt.close()
-
-            # Gráfico de ventas por mes
-            meses = [datetime.strptime(m[0], '%Y-%m').strftime('%b %Y') for m in estadisticas['meses_top']]
-            ventas_mes = [m[1] for m in estadisticas['meses_top']]
-
-            plt.figure(figsize=(12, 6))
-            plt.plot(meses, ventas_mes, marker='o', linestyle='-', color='green')
-            plt.title('Ventas por Mes')
-            plt.xlabel('Mes')
-            plt.ylabel('Ventas ($)')
-            plt.xticks(rotation=45, ha='right')
-            plt.grid(True, linestyle='--', alpha=0.7)
-            plt.tight_layout()
-            plt.savefig(os.path.join(directorio_salida, 'ventas_por_mes.png'))
-            plt.close()
-
-            # Gráfico de ventas por categoría
-            categorias = [c[0] for c in estadisticas['categorias']]
-            ventas_cat = [c[1] for c in estadisticas['categorias']]
-
-            plt.figure(figsize=(10, 7))
-            plt.pie(ventas_cat, labels=categorias, autopct='%1.1f%%', startangle=140, shadow=True)
-            plt.title('Distribución de Ventas por Categoría')
-            plt.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
-            plt.tight_layout()
-            plt.savefig(os.path.join(directorio_salida, 'ventas_por_categoria.png'))
-            plt.close()
+            graficos = {
+                # Gráfico de productos más vendidos
+                'productos_top.png': (graficar_productos_top, (
+                    [p[0] for p in estadisticas['productos_top'][:5]],
+                    [p[1] for p in estadisticas['productos_top'][:5]]
+                )),
+                # Gráfico de ventas por mes
+                'ventas_por_mes.png': (graficar_ventas_por_mes, (
+                    [formatear_mes(m[0], '%b %Y') for m in estadisticas['meses_top']],
+                    [m[1] for m in estadisticas['meses_top']]
+                )),
+                # Gráfico de ventas por categoría
+                'ventas_por_categoria.png': (graficar_ventas_por_categoria, (
+                    [c[0] for c in estadisticas['categorias']],
+                    [c[1] for c in estadisticas['categorias']]
+                ))
+            }
+
+            ruta_hashes = os.path.join(directorio_salida, GRAFICOS_HASHES)
+            try:
+                with open(ruta_hashes, 'r', encoding='utf-8') as archivo_hashes:
+                    hashes = json.load(archivo_hashes)
+            except (OSError, ValueError):
+                hashes = {}
+
+            pendientes = []
+            for nombre, (funcion, datos) in graficos.items():
+                ruta = os.path.join(directorio_salida, nombre)
+                resumen = hash_grafico(funcion, datos)
+                if hashes.get(nombre) == resumen and os.path.exists(ruta):
+                    continue
+                pendientes.append((nombre, funcion, ruta, datos, resumen))
+
+            if procesos > 1 and len(pendientes) > 1:
+                with ProcessPoolExecutor(max_workers=min(procesos, len(pendientes))) as executor:
+                    futuros = [executor.submit(funcion, ruta, *datos) for _, funcion, ruta, datos, _ in pendientes]
+                    for futuro in futuros:
+                        futuro.result()
+            else:
+                for _, funcion, ruta, datos, _ in pendientes:
+                    funcion(ruta, *datos)
+
+            if pendientes:
+                for nombre, _, _, _, resumen in pendientes:
+                    hashes[nombre] = resumen
+                guardar_json(ruta_hashes, hashes)
 
             return True
         except Exception as e:
@@ -343,6 +1903,11 @@ if __name__ == "__main__":
         os.makedirs('reportes')
 
     # Procesar ventas
+    # Para archivos más grandes que la memoria: procesador.procesar_por_bloques()
+    # Para un CSV al que se le siguen agregando ventas, refrescar sólo lo nuevo:
+    # procesador.actualizar_datos('reportes/ventas.checkpoint.json')
+    # Para muchos archivos en paralelo:
+    # ProcesadorVentas('ventas/*.csv').procesar_por_bloques(procesos=None)
     procesador = ProcesadorVentas('ventas.csv')
     if procesador.cargar_datos():
         procesador.analizar_datos()
@@ -354,6 +1919,15 @@ if __name__ == "__main__":
         # Generar gráficos
         procesador.generar_graficos('reportes')
 
+        # Otras agrupaciones, por ejemplo ventas por categoría y semana:
+        # procesador.agrupar([('categoria', 'semana')], {'ventas': ('suma', 'total')})
+        # o una tabla dinámica producto x mes:
+        # productos, meses, matriz = procesador.pivotar('producto', 'mes')
+
         print("Informes y gráficos generados en la carpeta 'reportes'")
     else:
-        print("No se pudieron cargar los datos de ventas")
\ No newline at end of file
+        print("No se pudieron cargar los datos de ventas")
+
+    # Para explorar archivos enormes sin cargarlos, estadísticas aproximadas
+    # con márgenes de error:
+    # ProcesadorVentas('ventas/*.csv').analizar_aproximado()
\ No newline at end of file